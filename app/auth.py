@@ -2,13 +2,25 @@ from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta, timezone
 import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, event
+from sqlalchemy.orm import Session, object_session
 from typing import Annotated
+import time
 
 from app.models import User as UserModel
-from app.config import JWT_SECRET_KEY, ALGORITHM
+from app.cache import TTLCache
+from app.config import (
+    JWT_SECRET_KEY,
+    ALGORITHM,
+    AUTH_CACHE_TTL,
+    AUTH_CACHE_SIZE,
+    PASSWORD_POOL_KIND,
+    PASSWORD_POOL_WORKERS,
+    PASSWORD_POOL_MAX_QUEUE,
+)
+from app.password_pool import PasswordWorkerPool
 from app.db_depends import get_async_db
 
 # Создание контекста для хеширования с использованием Bcrypt
@@ -19,6 +31,11 @@ REFRESH_TOKEN_EXPIRE_DAYS = 7
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/token")
 
+# Проверенные payload токенов (ключ - сам токен) и снимки пользователей
+# (ключ - claim "id"), чтобы не ходить в БД на каждый запрос
+_token_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+_user_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -28,6 +45,23 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+# bcrypt держит CPU десятки миллисекунд, поэтому из async-обработчиков
+# хеширование уходит в отдельный ограниченный пул, а не в event loop
+password_pool = PasswordWorkerPool(
+    kind=PASSWORD_POOL_KIND,
+    workers=PASSWORD_POOL_WORKERS,
+    max_queue=PASSWORD_POOL_MAX_QUEUE,
+)
+
+
+async def hash_password_async(password: str) -> str:
+    return await password_pool.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -42,7 +76,57 @@ def create_refresh_token(data: dict) -> str:
     return jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=ALGORITHM)
 
 
+def invalidate_user_cache(user_id: int) -> None:
+    """
+    Удаляет пользователя из кэша. Изменения через ORM сбрасываются
+    автоматически, при массовых update(UserModel) функцию нужно вызвать явно.
+    """
+    _user_cache.pop(user_id)
+
+
+@event.listens_for(UserModel, "after_update")
+@event.listens_for(UserModel, "after_delete")
+def _on_user_changed(mapper, connection, target: UserModel) -> None:
+    invalidate_user_cache(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session: Session) -> None:
+    # Повторный сброс после коммита: между flush и commit параллельный
+    # запрос мог успеть положить в кэш старую версию пользователя
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate_user_cache(user_id)
+
+
+def _decode_token(token: str) -> dict:
+    payload = _token_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[ALGORITHM])
+        ttl = min(AUTH_CACHE_TTL, payload.get("exp", 0) - time.time())
+        if ttl > 0:
+            _token_cache.set(token, payload, ttl=ttl)
+    return payload
+
+
+def token_user_id(request: Request) -> int | None:
+    """
+    Claim "id" из Bearer-токена запроса без обращения к БД или None,
+    если токена нет или он недействителен.
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return _decode_token(token).get("id")
+    except jwt.PyJWTError:
+        return None
+
+
 async def get_current_user(
+    request: Request,
     token: Annotated[str, Depends(oauth2_scheme)],
     db: Annotated[AsyncSession, Depends(get_async_db)],
 ) -> UserModel:
@@ -52,7 +136,7 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _decode_token(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
@@ -64,10 +148,27 @@ async def get_current_user(
         )
     except jwt.PyJWTError:
         raise credentials_exception
+
+    user_id = payload.get("id")
+    snapshot = _user_cache.get(user_id) if user_id is not None else None
+    if snapshot is not None and snapshot["email"] == email:
+        request.state.user_id = user_id
+        # Отдельный объект на запрос, чтобы запросы не делили общее состояние
+        return UserModel(**snapshot)
+
     result = await db.scalars(select(UserModel).where(email == UserModel.email))
     user = result.first()
     if user is None:
         raise credentials_exception
+    if user_id == user.id:
+        _user_cache.set(
+            user.id,
+            {
+                column.key: getattr(user, column.key)
+                for column in UserModel.__table__.columns
+            },
+        )
+    request.state.user_id = user.id
     return user
 
 
@@ -0,0 +1,134 @@
+import codecs
+import csv
+import json
+from collections import deque
+from typing import Any, AsyncIterator
+
+from fastapi import Request
+
+from app.config import BULK_IMPORT_MAX_LINE_BYTES
+
+
+class RowError(Exception):
+    """
+    Строка файла, которую не удалось разобрать.
+    """
+
+
+async def iter_lines(request: Request) -> AsyncIterator[tuple[int, str]]:
+    """
+    Построчно читает тело запроса по мере поступления, не загружая его
+    целиком. Возвращает пары (номер строки, строка).
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    line_no = 0
+    skipping = False
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        if skipping:
+            # Пропускаем остаток слишком длинной строки до её конца
+            if "\n" not in buffer:
+                buffer = ""
+                continue
+            buffer = buffer.split("\n", 1)[1]
+            skipping = False
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            line_no += 1
+            yield line_no, line.rstrip("\r")
+        if len(buffer) > BULK_IMPORT_MAX_LINE_BYTES:
+            line_no += 1
+            yield line_no, RowError("Line is too long")
+            buffer = ""
+            skipping = True
+    buffer += decoder.decode(b"", final=True)
+    if buffer and not skipping:
+        yield line_no + 1, buffer.rstrip("\r")
+
+
+class _LineFeed:
+    """
+    Источник строк для csv.reader: строки подкладываются по мере чтения
+    тела запроса, а читатель забирает их, пока не соберёт запись.
+    """
+
+    def __init__(self) -> None:
+        self.lines: deque[str] = deque()
+
+    def __iter__(self) -> "_LineFeed":
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def iter_rows(request: Request) -> AsyncIterator[tuple[int, Any]]:
+    """
+    Разбирает поток NDJSON (по объекту на строку) или CSV с заголовком.
+    Для каждой непустой строки отдаёт (номер строки, dict) либо
+    (номер строки, RowError). Запись CSV может занимать несколько строк
+    (перевод строки в кавычках), её номер - номер первой строки.
+    """
+    is_csv = request.headers.get("content-type", "").startswith("text/csv")
+    header = None
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    record_no, record_size, in_quotes = 0, 0, False
+    async for line_no, line in iter_lines(request):
+        if isinstance(line, RowError):
+            yield line_no, line
+            continue
+        if not is_csv:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_no, RowError(f"Invalid JSON: {e}")
+                continue
+            if not isinstance(row, dict):
+                yield line_no, RowError("Row must be a JSON object")
+                continue
+            yield line_no, row
+            continue
+
+        if not in_quotes:
+            if not line.strip():
+                continue
+            record_no, record_size = line_no, 0
+        # Удвоенная кавычка внутри поля не меняет чётность: запись
+        # закончена, когда кавычки сбалансированы
+        in_quotes ^= line.count('"') % 2 == 1
+        record_size += len(line)
+        if in_quotes and record_size > BULK_IMPORT_MAX_LINE_BYTES:
+            feed.lines.clear()
+            in_quotes = False
+            yield record_no, RowError("Row is too long")
+            continue
+        feed.lines.append(line + "\n")
+        if in_quotes:
+            continue
+
+        try:
+            values = next(reader)
+        except csv.Error as e:
+            feed.lines.clear()
+            yield record_no, RowError(f"Invalid CSV: {e}")
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield record_no, RowError(
+                f"Expected {len(header)} columns, got {len(values)}"
+            )
+            continue
+        # Пустая ячейка CSV означает отсутствие значения
+        yield record_no, {
+            name: value for name, value in zip(header, values) if value != ""
+        }
+    if in_quotes:
+        yield record_no, RowError("Invalid CSV: unterminated quoted field")
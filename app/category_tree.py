@@ -0,0 +1,154 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import CATEGORY_TREE_TTL
+from app.database import async_session_maker
+from app.db_depends import replica_may_lag
+from app.models.categories import Category
+from app.models.products import Product
+
+
+@dataclass
+class CategoryNode:
+    id: int
+    name: str
+    parent_id: int | None
+    product_count: int = 0
+    subtree_product_count: int = 0
+    children: list["CategoryNode"] = field(default_factory=list)
+    subtree_ids: frozenset[int] = frozenset()
+
+
+class CategoryTree:
+    """
+    Снимок дерева активных категорий с заранее посчитанными множествами
+    потомков и количеством активных товаров по узлам и поддеревьям.
+    """
+
+    def __init__(self, categories: list[tuple], product_counts: dict[int, int]):
+        self.nodes = {
+            category_id: CategoryNode(
+                id=category_id,
+                name=name,
+                parent_id=parent_id,
+                product_count=product_counts.get(category_id, 0),
+            )
+            for category_id, name, parent_id in categories
+        }
+        self.roots: list[CategoryNode] = []
+        for node in self.nodes.values():
+            parent = self.nodes.get(node.parent_id)
+            # Категория с неактивным родителем поднимается в корень
+            if parent is None:
+                self.roots.append(node)
+            else:
+                parent.children.append(node)
+        for root in self.roots:
+            self._fill_subtree(root)
+
+    def _fill_subtree(self, root: CategoryNode) -> None:
+        # Обход без рекурсии: глубина дерева ничем не ограничена
+        order, stack = [], [root]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(node.children)
+        for node in reversed(order):
+            ids = {node.id}
+            count = node.product_count
+            for child in node.children:
+                ids |= child.subtree_ids
+                count += child.subtree_product_count
+            node.subtree_ids = frozenset(ids)
+            node.subtree_product_count = count
+
+    def subtree_ids(self, category_id: int) -> frozenset[int]:
+        """
+        id категории и всех её потомков. Для неизвестной или неактивной
+        категории - только она сама.
+        """
+        node = self.nodes.get(category_id)
+        if node is None or not node.subtree_ids:
+            return frozenset((category_id,))
+        return node.subtree_ids
+
+    def ancestor_ids(self, category_id: int) -> list[int]:
+        """
+        Категория и все её предки до корня.
+        """
+        ids = [category_id]
+        node = self.nodes.get(category_id)
+        while node is not None and node.parent_id is not None:
+            if node.parent_id in ids:
+                break
+            ids.append(node.parent_id)
+            node = self.nodes.get(node.parent_id)
+        return ids
+
+
+class CategoryTreeCache:
+    """
+    Держит один снимок дерева на процесс. Обработчики записи категорий
+    и товаров вызывают invalidate(), TTL страхует от записей в других
+    воркерах.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._tree: CategoryTree | None = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._invalidated_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        self._tree = None
+        self._generation += 1
+        self._invalidated_at = time.monotonic()
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._tree is not None
+            and time.monotonic() - self._loaded_at < self.ttl
+        )
+
+    async def get(self, db: AsyncSession) -> CategoryTree:
+        if self._is_fresh():
+            return self._tree
+        async with self._lock:
+            if self._is_fresh():
+                return self._tree
+            generation = self._generation
+            if replica_may_lag(db, self._invalidated_at):
+                # Сразу после записи реплика может отдать старое дерево,
+                # и оно прожило бы весь TTL - читаем снимок с primary
+                async with async_session_maker() as primary:
+                    tree = await self._load(primary)
+            else:
+                tree = await self._load(db)
+            # Запись во время загрузки: снимок мог устареть, не кэшируем его
+            if generation == self._generation:
+                self._tree = tree
+                self._loaded_at = time.monotonic()
+            return tree
+
+    @staticmethod
+    async def _load(db: AsyncSession) -> CategoryTree:
+        categories = await db.execute(
+            select(Category.id, Category.name, Category.parent_id)
+            .where(Category.is_active)
+            .order_by(Category.id)
+        )
+        counts = await db.execute(
+            select(Product.category_id, func.count())
+            .where(Product.is_active)
+            .group_by(Product.category_id)
+        )
+        return CategoryTree(categories.all(), dict(counts.all()))
+
+
+category_tree = CategoryTreeCache(ttl=CATEGORY_TREE_TTL)
@@ -0,0 +1,20 @@
+"""
+Пересборка дневной статистики продаж продавцов по оплаченным заказам.
+
+Запуск: python -m app.commands.rebuild_seller_stats
+"""
+
+import asyncio
+
+from app.database import async_session_maker
+from app.seller_stats import recompute_seller_stats
+
+
+async def main() -> None:
+    async with async_session_maker() as db:
+        await recompute_seller_stats(db)
+        await db.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,20 @@
+"""
+Пересчёт денормализованных рейтингов товаров по активным отзывам.
+
+Запуск: python -m app.commands.recompute_ratings
+"""
+
+import asyncio
+
+from app.database import async_session_maker
+from app.ratings import recompute_ratings
+
+
+async def main() -> None:
+    async with async_session_maker() as db:
+        await recompute_ratings(db)
+        await db.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
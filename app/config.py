@@ -4,5 +4,122 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 JWT_SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
+
+# Подсчёт total в списках: время жизни и размер кэша,
+# порог, начиная с которого доверяем оценке планировщика
+TOTALS_CACHE_TTL = float(os.getenv("TOTALS_CACHE_TTL", "60"))
+TOTALS_CACHE_SIZE = int(os.getenv("TOTALS_CACHE_SIZE", "1024"))
+TOTALS_ESTIMATE_THRESHOLD = int(os.getenv("TOTALS_ESTIMATE_THRESHOLD", "10000"))
+
+# Кэш аутентификации: проверенные токены и пользователи
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "30"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
+# Пул для bcrypt: thread или process, число воркеров и длина очереди,
+# сверх которой запросы отклоняются с 503
+PASSWORD_POOL_KIND = os.getenv("PASSWORD_POOL_KIND", "thread")
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", os.cpu_count() or 4))
+PASSWORD_POOL_MAX_QUEUE = int(os.getenv("PASSWORD_POOL_MAX_QUEUE", "64"))
+
+# Снимок дерева категорий перечитывается не реже, чем раз в TTL секунд
+CATEGORY_TREE_TTL = float(os.getenv("CATEGORY_TREE_TTL", "300"))
+
+# Кэш ответов публичного каталога: memory (в процессе) или none
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Кэш полнотекстового поиска: ранжированные списки id по запросу и
+# фильтрам, сколько id хранить на один запрос
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "60"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1000"))
+SEARCH_CACHE_MAX_IDS = int(os.getenv("SEARCH_CACHE_MAX_IDS", "1000"))
+
+# Подсказки названий товаров: кэш горячих префиксов, сколько подсказок
+# отдавать по умолчанию и порог похожести для поиска с опечатками (pg_trgm)
+SUGGEST_CACHE_TTL = float(os.getenv("SUGGEST_CACHE_TTL", "60"))
+SUGGEST_CACHE_SIZE = int(os.getenv("SUGGEST_CACHE_SIZE", "10000"))
+SUGGEST_LIMIT = int(os.getenv("SUGGEST_LIMIT", "10"))
+SUGGEST_FUZZY_THRESHOLD = float(os.getenv("SUGGEST_FUZZY_THRESHOLD", "0.5"))
+
+# Массовый импорт товаров: строк в одной пачке вставки, сколько ошибок
+# вернуть в отчёте, предельная длина строки файла
+BULK_IMPORT_CHUNK_SIZE = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "1000"))
+BULK_IMPORT_MAX_ERRORS = int(os.getenv("BULK_IMPORT_MAX_ERRORS", "1000"))
+BULK_IMPORT_MAX_LINE_BYTES = int(os.getenv("BULK_IMPORT_MAX_LINE_BYTES", "65536"))
+
+# Выгрузки: сколько строк серверный курсор отдаёт за раз
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+
+# Подключение к БД. DATABASE_URL имеет приоритет над POSTGRES_*
+DATABASE_URL = os.getenv("DATABASE_URL") or (
+    f"postgresql+asyncpg://{os.getenv('POSTGRES_USER')}:"
+    f"{os.getenv('POSTGRES_PASSWORD')}@{os.getenv('POSTGRES_HOST', 'db')}:"
+    f"{os.getenv('POSTGRES_PORT', '5432')}/{os.getenv('POSTGRES_DB', 'ecommerce_db')}"
+)
+
+# Пул соединений: на воркер держится до DB_POOL_SIZE + DB_MAX_OVERFLOW
+# соединений, сумма по всем воркерам должна укладываться в max_connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Кэш подготовленных выражений asyncpg на соединение (0 - выключен,
+# нужно при pgbouncer в режиме transaction)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+# statement_timeout для каждого соединения, мс (0 - без ограничения)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+DB_ECHO = _env_bool("DB_ECHO", False)
+# Сколько ждать установки соединения, с (важно для быстрого отказа реплики)
+DB_CONNECT_TIMEOUT = float(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+
+# Реплики для чтения: строки подключения через запятую
+DATABASE_REPLICA_URLS = [
+    url.strip()
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+# После записи клиент читает с primary столько секунд (read-your-writes)
+REPLICA_READ_YOUR_WRITES_SECONDS = float(
+    os.getenv("REPLICA_READ_YOUR_WRITES_SECONDS", "5")
+)
+# Недоступная реплика исключается из ротации на это время, с
+REPLICA_RETRY_AFTER_SECONDS = float(os.getenv("REPLICA_RETRY_AFTER_SECONDS", "30"))
+# Период фоновой проверки реплик, с
+REPLICA_HEALTH_CHECK_SECONDS = float(os.getenv("REPLICA_HEALTH_CHECK_SECONDS", "5"))
+
+# Middleware метрик и эндпоинт /metrics
+METRICS_ENABLED = _env_bool("METRICS_ENABLED", True)
+
+# Отладка SQL: счётчик запросов на HTTP-запрос и поиск N+1
+QUERY_DEBUG = _env_bool("QUERY_DEBUG", False)
+# Бюджет SQL-запросов на HTTP-запрос (0 - без ограничения)
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "20"))
+# log - только предупреждение в логе, raise - запрос завершается ошибкой
+QUERY_BUDGET_ACTION = os.getenv("QUERY_BUDGET_ACTION", "log")
+# Сколько одинаковых по форме запросов считать признаком N+1
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "3"))
+
+# Журнал запросов (JSON-строки) и прочие логи приложения
+LOG_FILE = os.getenv("LOG_FILE", "info.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Доля успешных запросов, попадающих в журнал; ошибки пишутся всегда
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+# Запросы дольше этого порога, мс, пишутся всегда
+LOG_SLOW_REQUEST_MS = float(os.getenv("LOG_SLOW_REQUEST_MS", "500"))
+# Размер очереди записи; при переполнении записи отбрасываются
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Ротация и хранение файлов журнала в формате loguru ("100 MB", "00:00", "7 days")
+LOG_ROTATION = os.getenv("LOG_ROTATION", "100 MB")
+LOG_RETENTION = os.getenv("LOG_RETENTION", "7 days")
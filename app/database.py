@@ -1,36 +1,190 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
-from dotenv import dotenv_values
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.orm import DeclarativeBase
-
-DATABASE_URL = "sqlite:///ecommerce.db"
+import asyncio
+import itertools
+import time
 
-engine = create_engine(DATABASE_URL, echo=True)
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    create_async_engine,
+    async_sessionmaker,
+    AsyncSession,
+)
+from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-SessionLocal = sessionmaker(bind=engine)
+from app.config import (
+    DATABASE_REPLICA_URLS,
+    DATABASE_URL,
+    DB_CONNECT_TIMEOUT,
+    DB_ECHO,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_STATEMENT_TIMEOUT_MS,
+    REPLICA_HEALTH_CHECK_SECONDS,
+    REPLICA_RETRY_AFTER_SECONDS,
+)
 
 
 class Base(DeclarativeBase):
     pass
 
 
-secrets = dotenv_values(".env")
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, который считает время ожидания свободного соединения.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        self.checkouts += 1
+        return connection
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+        }
+
+
+def create_engine(url: str) -> AsyncEngine:
+    """
+    Создаёт async-движок с настройками пула и соединений из конфигурации.
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        # SQLite используется только как локальная замена Postgres
+        return create_async_engine(url, echo=DB_ECHO)
+
+    connect_args = {}
+    if make_url(url).get_driver_name() == "asyncpg":
+        connect_args["prepared_statement_cache_size"] = DB_STATEMENT_CACHE_SIZE
+        connect_args["timeout"] = DB_CONNECT_TIMEOUT
+        if DB_STATEMENT_TIMEOUT_MS:
+            connect_args["server_settings"] = {
+                "statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)
+            }
+    return create_async_engine(
+        url,
+        echo=DB_ECHO,
+        poolclass=InstrumentedPool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        pool_recycle=DB_POOL_RECYCLE,
+        connect_args=connect_args,
+    )
+
+
+def pool_stats(engine: AsyncEngine) -> dict:
+    pool = engine.pool
+    if isinstance(pool, InstrumentedPool):
+        return pool.stats()
+    return {"status": pool.status()}
 
-# Строка подключения для SQLite
-DATABASE_URL = (
-    f"postgresql+asyncpg://{secrets['POSTGRES_USER']}:"
-    f"{secrets['POSTGRES_PASSWORD']}@db:5432/ecommerce_db"
-)
 
-# Создаём Engine
-async_engine = create_async_engine(DATABASE_URL, echo=True)
+class ReplicaSet:
+    """
+    Реплики для чтения с выбором по кругу. Реплика, к которой не удалось
+    подключиться, пропускается REPLICA_RETRY_AFTER_SECONDS секунд или до
+    первой успешной фоновой проверки.
+    """
+
+    def __init__(self, urls: list[str]):
+        self.urls = urls
+        self.engines = [create_engine(url) for url in urls]
+        self.session_makers = [
+            async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+            for engine in self.engines
+        ]
+        self._down_until = [0.0] * len(urls)
+        self._counter = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def candidates(self) -> list[int]:
+        """
+        Индексы доступных реплик, начиная со следующей по кругу.
+        """
+        count = len(self.engines)
+        if not count:
+            return []
+        start = next(self._counter) % count
+        now = time.monotonic()
+        indexes = ((start + offset) % count for offset in range(count))
+        return [index for index in indexes if self._down_until[index] <= now]
+
+    def mark_down(self, index: int) -> None:
+        self._down_until[index] = time.monotonic() + REPLICA_RETRY_AFTER_SECONDS
+
+    def mark_up(self, index: int) -> None:
+        self._down_until[index] = 0.0
+
+    async def check(self) -> None:
+        """
+        Проверяет каждую реплику запросом SELECT 1 и обновляет её статус.
+        """
+        for index, engine in enumerate(self.engines):
+            try:
+                async with asyncio.timeout(DB_CONNECT_TIMEOUT):
+                    async with engine.connect() as connection:
+                        await connection.execute(text("SELECT 1"))
+            except (DBAPIError, OSError, TimeoutError):
+                self.mark_down(index)
+            else:
+                self.mark_up(index)
+
+    async def run_health_checks(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(REPLICA_HEALTH_CHECK_SECONDS)
+
+    def stats(self) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "url": engine.url.render_as_string(hide_password=True),
+                "healthy": self._down_until[index] <= now,
+                **pool_stats(engine),
+            }
+            for index, engine in enumerate(self.engines)
+        ]
+
+
+async_engine = create_engine(DATABASE_URL)
 
 # Настраиваем фабрику сеансов
 async_session_maker = async_sessionmaker(
     async_engine, expire_on_commit=False, class_=AsyncSession
 )
 
-
-class Base(DeclarativeBase):
-    pass
+replicas = ReplicaSet(DATABASE_REPLICA_URLS)
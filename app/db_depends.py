@@ -1,21 +1,18 @@
-from sqlalchemy.orm import Session
-from fastapi import Depends
+import asyncio
+import time
+from typing import AsyncGenerator, Callable
 
-from app.database import SessionLocal
-
-
-def get_db() -> Session:
-    db: Session = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+from fastapi import Request
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.cache import TTLCache
+from app.config import REPLICA_READ_YOUR_WRITES_SECONDS
+from app.database import async_engine, async_session_maker, replicas
 
-from typing import AsyncGenerator
-from fastapi import HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import async_session_maker
+# Клиенты, недавно писавшие в БД: их чтения идут на primary,
+# пока реплики не догнали запись
+_recent_writers = TTLCache(maxsize=100_000, ttl=REPLICA_READ_YOUR_WRITES_SECONDS)
 
 
 async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
@@ -24,3 +21,68 @@ async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
     """
     async with async_session_maker() as session:
         yield session
+
+
+def pin_to_primary(user_id: int) -> None:
+    """
+    Отмечает пользователя как только что писавшего в БД.
+    """
+    _recent_writers.set(user_id, True)
+
+
+def _is_pinned(request: Request) -> bool:
+    # id из проверенного токена кладёт read_your_writes_middleware,
+    # анонимные клиенты не закрепляются
+    user_id = getattr(request.state, "token_user_id", None)
+    return user_id is not None and _recent_writers.get(user_id) is not None
+
+
+def replica_may_lag(db: AsyncSession, invalidated_at: float) -> bool:
+    """
+    Сессия читает с реплики, а кэш сброшен записью меньше
+    REPLICA_READ_YOUR_WRITES_SECONDS назад: реплика может ещё не содержать
+    эту запись, и снимок из неё нельзя класть в кэш процесса.
+    """
+    return (
+        db.bind is not async_engine
+        and time.monotonic() - invalidated_at < REPLICA_READ_YOUR_WRITES_SECONDS
+    )
+
+
+def read_session_maker(request: Request) -> Callable[[], AsyncSession]:
+    """
+    Фабрика сессий для чтения без проверки соединения: для выгрузок,
+    которые открывают сессию сами.
+    """
+    if not _is_pinned(request):
+        for index in replicas.candidates():
+            request.state.read_replica = True
+            return replicas.session_makers[index]
+    return async_session_maker
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия для чтения: реплика по кругу, primary - если реплик нет,
+    все недоступны или пользователь только что писал в БД.
+    """
+    if not _is_pinned(request):
+        for index in replicas.candidates():
+            # Соединение берётся при первом запросе обработчика: ответ из
+            # кэша не трогает БД. Доступность реплик отслеживает фоновая
+            # проверка, упавшая реплика исключается при первой ошибке
+            request.state.read_replica = True
+            async with replicas.session_makers[index]() as session:
+                try:
+                    yield session
+                except (OSError, asyncio.TimeoutError):
+                    replicas.mark_down(index)
+                    raise
+                except DBAPIError as e:
+                    if e.connection_invalidated:
+                        replicas.mark_down(index)
+                    raise
+            return
+
+    async with async_session_maker() as session:
+        yield session
@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, Callable
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import EXPORT_BATCH_SIZE
+
+EXPORT_FORMATS_PATTERN = "^(ndjson|csv)$"
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+async def _iter_export(
+    session_factory: Callable[[], AsyncSession],
+    stmt: Select,
+    columns: list[str],
+    fmt: str,
+) -> AsyncIterator[bytes]:
+    # Сессия открывается внутри генератора: зависимость get_async_db
+    # закрывается раньше, чем StreamingResponse начинает отдавать тело
+    async with session_factory() as session:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue().encode()
+
+        result = await session.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        # Серверный курсор отдаёт строки пачками, в памяти одна пачка
+        async for rows in result.partitions():
+            if fmt == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows(rows)
+                yield buffer.getvalue().encode()
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(columns, row)), default=str) + "\n"
+                    for row in rows
+                ).encode()
+
+
+def export_response(
+    session_factory: Callable[[], AsyncSession],
+    stmt: Select,
+    fmt: str,
+    filename: str,
+) -> StreamingResponse:
+    """
+    Потоковая выгрузка результата запроса в NDJSON или CSV.
+    Ожидает core-select по столбцам, без ORM-объектов.
+    """
+    columns = [column.key for column in stmt.selected_columns]
+    return StreamingResponse(
+        _iter_export(session_factory, stmt, columns, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
@@ -0,0 +1,129 @@
+from typing import Any
+
+from sqlalchemy import case, func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.products import Product
+
+FACET_NAMES = ("category", "price", "stock", "seller")
+FACETS_PATTERN = rf"^({'|'.join(FACET_NAMES)})(,({'|'.join(FACET_NAMES)}))*$"
+
+
+def parse_facets(value: str | None) -> tuple[str, ...]:
+    if not value:
+        return ()
+    requested = set(value.split(","))
+    return tuple(name for name in FACET_NAMES if name in requested)
+
+
+def _by_count(item: tuple) -> tuple:
+    value, count = item
+    return -count, value
+
+
+async def compute_facets(
+    db: AsyncSession, filters: list, facets: tuple[str, ...], price_buckets: int
+) -> tuple[int, dict[str, Any]]:
+    """
+    Счётчики фасетов по товарам, подходящим под filters, и их общее число.
+
+    Всё считается одним агрегатным запросом: подходящие строки читаются
+    один раз (поиск по tsv тоже выполняется один раз), а GROUPING SETS
+    даёт по набору строк на каждый фасет плюс общий итог. Цены делятся
+    на price_buckets равных интервалов между минимальной и максимальной
+    ценой подходящих товаров (width_bucket).
+    """
+    matched = (
+        select(Product.category_id, Product.seller_id, Product.price, Product.stock)
+        .where(*filters)
+        .cte("matched")
+    )
+    bounds = (
+        select(
+            func.min(matched.c.price).label("low"),
+            func.max(matched.c.price).label("high"),
+        )
+        .cte("bounds")
+    )
+    # Максимальная цена попадает в последний интервал, а не в n + 1;
+    # при одной цене на все товары интервал один
+    bucket = case(
+        (
+            bounds.c.high > bounds.c.low,
+            func.least(
+                func.width_bucket(
+                    matched.c.price, bounds.c.low, bounds.c.high, price_buckets
+                ),
+                price_buckets,
+            ),
+        ),
+        else_=literal(1),
+    ).label("bucket")
+    in_stock = (matched.c.stock > 0).label("in_stock")
+    keys = {
+        "category": matched.c.category_id,
+        "price": bucket,
+        "stock": in_stock,
+        "seller": matched.c.seller_id,
+    }
+    requested = [keys[name] for name in facets]
+    rows = (
+        await db.execute(
+            select(
+                *requested,
+                func.grouping(*requested).label("grouping"),
+                func.count().label("count"),
+                func.max(bounds.c.low).label("low"),
+                func.max(bounds.c.high).label("high"),
+            )
+            .select_from(matched)
+            .join(bounds, literal(True))
+            .group_by(
+                func.grouping_sets(*(tuple_(key) for key in requested), tuple_())
+            )
+        )
+    ).all()
+
+    # Бит grouping() равен 1, если столбец не участвует в наборе строки
+    all_bits = (1 << len(requested)) - 1
+    total, low, high = 0, None, None
+    counts: dict[str, list] = {name: [] for name in facets}
+    for row in rows:
+        if row.grouping == all_bits:
+            total, low, high = row.count, row.low, row.high
+            continue
+        for position, name in enumerate(facets):
+            if not row.grouping >> (len(requested) - 1 - position) & 1:
+                counts[name].append((row[position], row.count))
+
+    # Все ключи ProductFacets в порядке схемы, незапрошенные - null
+    result: dict[str, Any] = dict.fromkeys(
+        ("categories", "price", "stock", "sellers")
+    )
+    if "category" in facets:
+        result["categories"] = [
+            {"value": value, "count": count}
+            for value, count in sorted(counts["category"], key=_by_count)
+        ]
+    if "seller" in facets:
+        result["sellers"] = [
+            {"value": value, "count": count}
+            for value, count in sorted(counts["seller"], key=_by_count)
+        ]
+    if "stock" in facets:
+        stock = dict(counts["stock"])
+        result["stock"] = {
+            "in_stock": stock.get(True, 0),
+            "out_of_stock": stock.get(False, 0),
+        }
+    if "price" in facets:
+        width = (high - low) / price_buckets if total else 0
+        result["price"] = [
+            {
+                "min": low + width * (number - 1),
+                "max": high if number == price_buckets else low + width * number,
+                "count": count,
+            }
+            for number, count in sorted(counts["price"])
+        ]
+    return total, result
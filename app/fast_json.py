@@ -0,0 +1,35 @@
+from typing import Any, Sequence
+
+import orjson
+from fastapi.responses import Response
+from sqlalchemy import Row
+
+
+def rows_to_dicts(rows: Sequence[Row], fields: Sequence[str]) -> list[dict[str, Any]]:
+    """
+    Быстрый путь больших списков: строки Core-запроса вместо ORM-объектов
+    и pydantic - в словари с ключами fields в порядке схемы ответа.
+    Лишние столбцы строки (id для курсора, ключ сортировки) отбрасываются.
+    """
+    if not rows:
+        return []
+    positions = [rows[0]._fields.index(name) for name in fields]
+    pairs = tuple(zip(fields, positions))
+    return [{name: row[position] for name, position in pairs} for row in rows]
+
+
+def dump_json(content: Any) -> bytes:
+    """
+    JSON через orjson: компактный, UTF-8 без экранирования, как у
+    сериализации pydantic, но без валидации и промежуточных моделей.
+    """
+    return orjson.dumps(content)
+
+
+def json_response(content: Any) -> Response:
+    """
+    Готовый ответ из уже собранного содержимого. FastAPI не прогоняет
+    Response через response_model, поэтому схема OpenAPI маршрута остаётся
+    прежней, а сериализация - в один проход orjson.
+    """
+    return Response(content=dump_json(content), media_type="application/json")
@@ -0,0 +1,37 @@
+from functools import lru_cache
+
+from pydantic import BaseModel, ConfigDict, create_model
+
+from app.schemas import ProductSheme
+
+PRODUCT_FIELDS = tuple(ProductSheme.model_fields)
+_FIELD_NAMES = "|".join(PRODUCT_FIELDS)
+PRODUCT_FIELDS_PATTERN = rf"^({_FIELD_NAMES})(,({_FIELD_NAMES}))*$"
+
+
+def parse_fields(value: str | None) -> tuple[str, ...] | None:
+    """
+    Поля товара из параметра fields в порядке ProductSheme; None - все поля.
+    """
+    if value is None:
+        return None
+    requested = set(value.split(","))
+    return tuple(name for name in PRODUCT_FIELDS if name in requested)
+
+
+# Наборов полей не больше 2 ** len(PRODUCT_FIELDS), модели создаются один раз
+@lru_cache(maxsize=None)
+def product_fields_model(fields: tuple[str, ...]) -> type[BaseModel]:
+    """
+    Схема товара только с полями fields, с теми же типами и описаниями,
+    что и в ProductSheme.
+    """
+    return create_model(
+        "ProductFields",
+        __config__=ConfigDict(from_attributes=True),
+        **{
+            name: (field.annotation, field)
+            for name, field in ProductSheme.model_fields.items()
+            if name in fields
+        },
+    )
@@ -1,39 +1,85 @@
-import uuid
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI, Request
-from loguru import logger
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
+
+from app import metrics
+from app.auth import password_pool, token_user_id
+from app.config import METRICS_ENABLED, QUERY_DEBUG
+from app.database import replicas
+from app.db_depends import pin_to_primary
+from app.query_budget import QueryBudgetMiddleware
+from app.request_logging import RequestLoggingMiddleware, request_log, setup_logging
+from app.routers import (
+    categories,
+    products,
+    users,
+    reviews,
+    orders,
+    cart,
+    sellers,
+    internal,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    health_checks = None
+    if replicas:
+        # Упавшая реплика выходит из ротации до запросов к ней, а
+        # поднявшаяся возвращается, не дожидаясь REPLICA_RETRY_AFTER_SECONDS
+        health_checks = asyncio.create_task(replicas.run_health_checks())
+    yield
+    if health_checks is not None:
+        health_checks.cancel()
+        with suppress(asyncio.CancelledError):
+            await health_checks
+    password_pool.shutdown()
+    request_log.shutdown()
 
-from app.routers import categories, products, users, reviews, orders, cart
 
 app = FastAPI(
     title="FastApi Интернет-магазин",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 
-@app.middleware("http")
-async def log_middleware(request: Request, call_next):
-    log_id = str(uuid.uuid4())
-    with logger.contextualize(log_id=log_id):
-        try:
-            response = await call_next(request)
-            if response.status_code in [401, 404, 402, 403]:
-                logger.warning(f"Request to {request.url.path} failed")
-            else:
-                logger.info(f"Request to {request.url.path} succeeded")
-        except Exception as e:
-            logger.error(f"Request to {request.url.path} failed: {e}")
-            response = JSONResponse(content={"success": False}, status_code=500)
-        return response
-
-
-logger.add(
-    "info.log",
-    format="Log: [{extra[log_id]}:{time} - {level} - {message}]",
-    level="INFO",
-    enqueue=True,
-)
+if QUERY_DEBUG:
+    # Внутреннее middleware: предупреждения пишутся с идентификатором запроса
+    app.add_middleware(QueryBudgetMiddleware)
+
+app.add_middleware(RequestLoggingMiddleware)
+
+
+async def read_your_writes_middleware(request: Request, call_next):
+    request.state.token_user_id = token_user_id(request)
+    response = await call_next(request)
+    # После успешной записи пользователь какое-то время читает только с
+    # primary. user_id ставит get_current_user, поэтому вход, регистрация и
+    # POST-чтения без аутентификации (/products/batch) никого не закрепляют
+    user_id = getattr(request.state, "user_id", None)
+    if (
+        user_id is not None
+        and request.method not in ("GET", "HEAD", "OPTIONS")
+        and response.status_code < 400
+    ):
+        pin_to_primary(user_id)
+    return response
+
+
+if replicas:
+    app.middleware("http")(read_your_writes_middleware)
+
+
+if METRICS_ENABLED:
+    # Добавлено последним, поэтому внешнее: видит и ответы 500,
+    # которые формирует RequestLoggingMiddleware
+    app.add_middleware(metrics.MetricsMiddleware)
+
+
+setup_logging()
 
 
 app.include_router(categories.router)
@@ -42,6 +88,16 @@ app.include_router(users.router)
 app.include_router(reviews.router)
 app.include_router(orders.router)
 app.include_router(cart.router)
+app.include_router(sellers.router)
+app.include_router(internal.router)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """
+    Метрики в текстовом формате Prometheus.
+    """
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 
 @app.get("/")
@@ -0,0 +1,286 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.database import async_engine, pool_stats, replicas
+
+if TYPE_CHECKING:
+    from app.query_budget import QueryTracker
+
+# Границы корзин гистограмм по умолчанию, как в клиентах Prometheus
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Монотонно растущий счётчик с метками.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: dict[tuple, float] = {}
+        if not self.labels:
+            self._values[()] = 0
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for values, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labels, values)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """
+    Значение, которое может расти и убывать.
+    """
+
+    kind = "gauge"
+
+    def dec(self, *label_values, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными границами корзин. Хранит некумулятивные
+    счётчики, накопленные суммы считаются только при выдаче.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # метки -> [счётчики по корзинам (+Inf последней), сумма]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        entry = self._values.get(label_values)
+        if entry is None:
+            entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def samples(self) -> Iterable[str]:
+        bucket_labels = self.labels + ("le",)
+        for values, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(bucket_labels, values + (_format_value(bound),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labels, values)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки запроса по шаблону маршрута",
+    labels=("method", "route"),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Запросы в обработке", labels=("method",)
+)
+RESPONSES = Counter(
+    "http_responses_total",
+    "Ответы по шаблону маршрута и коду статуса",
+    labels=("method", "route", "status"),
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Число SQL-запросов на один HTTP-запрос",
+    labels=("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_seconds",
+    "Время выполнения SQL на один HTTP-запрос",
+    labels=("method", "route"),
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Время выполнения одного SQL-запроса", labels=("pool",)
+)
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total", "Записи журнала запросов, отброшенные при полной очереди"
+)
+
+METRICS = (
+    REQUEST_DURATION,
+    REQUESTS_IN_PROGRESS,
+    RESPONSES,
+    REQUEST_DB_QUERIES,
+    REQUEST_DB_DURATION,
+    DB_QUERY_DURATION,
+    LOG_RECORDS_DROPPED,
+)
+
+# Метрики пулов соединений: поле pool_stats -> (имя, тип, описание)
+POOL_METRICS = {
+    "checked_out": ("db_pool_checked_out", "gauge", "Выданные соединения"),
+    "overflow": ("db_pool_overflow", "gauge", "Соединения сверх pool_size"),
+    "checkouts": ("db_pool_checkouts_total", "counter", "Выдачи соединений"),
+    "timeouts": ("db_pool_timeouts_total", "counter", "Таймауты ожидания соединения"),
+    "wait_seconds_total": (
+        "db_pool_wait_seconds_total",
+        "counter",
+        "Суммарное ожидание свободного соединения",
+    ),
+}
+
+
+class _RequestDbStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+# Счётчики SQL текущего запроса. Объект изменяемый: события движка
+# выполняются в greenlet SQLAlchemy с копией контекста
+_request_db_stats: ContextVar[_RequestDbStats | None] = ContextVar(
+    "request_db_stats", default=None
+)
+# Активные счётчики бюджета запросов (app.query_budget): те же события
+# движка, без второй пары обработчиков
+query_trackers: ContextVar[tuple["QueryTracker", ...]] = ContextVar(
+    "query_trackers", default=()
+)
+
+
+def instrument_engine(engine: AsyncEngine, pool_name: str) -> None:
+    """
+    Подписывается на события движка и считает число и время SQL-запросов.
+    """
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        for tracker in query_trackers.get():
+            tracker.record(statement)
+        conn.info["query_started_at"] = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop("query_started_at")
+        DB_QUERY_DURATION.observe(elapsed, pool_name)
+        stats = _request_db_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += elapsed
+        for tracker in query_trackers.get():
+            tracker.seconds += elapsed
+
+
+instrument_engine(async_engine, "primary")
+for _index, _engine in enumerate(replicas.engines):
+    instrument_engine(_engine, f"replica{_index}")
+
+
+def _pool_samples() -> Iterable[str]:
+    engines = [("primary", async_engine)] + [
+        (f"replica{index}", engine) for index, engine in enumerate(replicas.engines)
+    ]
+    stats = [(name, pool_stats(engine)) for name, engine in engines]
+    for field, (name, kind, documentation) in POOL_METRICS.items():
+        yield f"# HELP {name} {documentation}"
+        yield f"# TYPE {name} {kind}"
+        for pool_name, values in stats:
+            if field in values:
+                yield f'{name}{{pool="{pool_name}"}} {_format_value(values[field])}'
+
+
+def render() -> str:
+    """
+    Все метрики в текстовом формате Prometheus.
+    """
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    lines.extend(_pool_samples())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware, снимающее длительность, код ответа и число SQL-запросов.
+
+    Маршрут берётся из шаблона (/products/{product_id}), а не из пути,
+    чтобы число рядов метрик не зависело от идентификаторов в URL.
+    Длительность включает отдачу тела, в том числе потоковых ответов.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        stats = _RequestDbStats()
+        token = _request_db_stats.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_PROGRESS.dec(method)
+            _request_db_stats.reset(token)
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "<unmatched>"
+            REQUEST_DURATION.observe(elapsed, method, template)
+            RESPONSES.inc(method, template, status)
+            REQUEST_DB_QUERIES.observe(stats.queries, method, template)
+            REQUEST_DB_DURATION.observe(stats.seconds, method, template)
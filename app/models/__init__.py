@@ -4,6 +4,7 @@ from .users import User
 from .reviews import Review
 from .orders import Order
 from .cart_items import CartItem
+from .seller_stats import SellerDailyStats
 
 
-__all__ = ["Category", "Product", "User", "Review", "Order", "CartItem"]
+__all__ = ["Category", "Product", "User", "Review", "Order", "CartItem", "SellerDailyStats"]
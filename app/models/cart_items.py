@@ -9,7 +9,7 @@ from app.database import Base
 class CartItem(Base):
     __tablename__ = "cart_items"
 
-    __table__args__ = (
+    __table_args__ = (
         UniqueConstraint("user_id", "product_id", name="unique_items_user_product"),
     )
 
@@ -1,6 +1,7 @@
+from datetime import datetime
 from typing import List
 
-from sqlalchemy import Integer, ForeignKey, Table, Column, Boolean
+from sqlalchemy import Integer, ForeignKey, Table, Column, Boolean, Numeric, Index, DateTime
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -9,14 +10,11 @@ order_products = Table(
     "order_products",
     Base.metadata,
     Column("id", Integer, primary_key=True),
-    Column(
-        "order_id",
-        Integer,
-        ForeignKey("orders.id"),
-        primary_key=True,
-        index=True,
-    ),
+    Column("order_id", Integer, ForeignKey("orders.id"), nullable=False, index=True),
     Column("product_id", Integer, ForeignKey("products.id")),
+    # Снимок позиции на момент оформления: цена товара потом может измениться
+    Column("quantity", Integer, nullable=False, server_default="1"),
+    Column("unit_price", Numeric(12, 2), nullable=False, server_default="0"),
 )
 
 
@@ -28,6 +26,17 @@ class Order(Base):
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     status: Mapped[str] = mapped_column(default="in process")
     total_price: Mapped[float] = mapped_column(default=0.0)
+    # Момент оплаты: по нему заказ попадает в дневную статистику продавцов
+    paid_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
     items: Mapped[List["Product"]] = relationship(
         "Product", back_populates="orders", secondary=order_products
     )
+
+    __table_args__ = (
+        # История заказов покупателя: keyset по id с фильтром по статусу
+        # и без него
+        Index("ix_orders_user_status_id", "user_id", "status", "id"),
+        Index("ix_orders_user_id_id", "user_id", "id"),
+    )
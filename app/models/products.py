@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import List
 
 from sqlalchemy import (
@@ -9,6 +10,11 @@ from sqlalchemy import (
     ForeignKey,
     Computed,
     Index,
+    DateTime,
+    DDL,
+    event,
+    func,
+    text,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import TSVECTOR
@@ -27,11 +33,26 @@ class Product(Base):
     image_url: Mapped[str] = mapped_column(String(500), nullable=True)
     stock: Mapped[int] = mapped_column(Integer, nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
-    rating: Mapped[float] = mapped_column(DECIMAL, server_default="0.0", default=0.0)
+    rating: Mapped[float] = mapped_column(
+        DECIMAL, server_default="0.0", default=0.0, nullable=False
+    )
+    # Денормализованные счётчики активных отзывов: rating = rating_sum / rating_count
+    rating_sum: Mapped[int] = mapped_column(Integer, server_default="0", default=0)
+    rating_count: Mapped[int] = mapped_column(Integer, server_default="0", default=0)
+    grade_1_count: Mapped[int] = mapped_column(Integer, server_default="0", default=0)
+    grade_2_count: Mapped[int] = mapped_column(Integer, server_default="0", default=0)
+    grade_3_count: Mapped[int] = mapped_column(Integer, server_default="0", default=0)
+    grade_4_count: Mapped[int] = mapped_column(Integer, server_default="0", default=0)
+    grade_5_count: Mapped[int] = mapped_column(Integer, server_default="0", default=0)
     category_id: Mapped[int] = mapped_column(
         ForeignKey("categories.id"), nullable=False
     )
     seller_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
     seller: Mapped["Users"] = relationship("User", back_populates="products")
     category: Mapped["Category"] = relationship("Category", back_populates="products")
     reviews: Mapped["Review"] = relationship("Review", back_populates="product")
@@ -51,12 +72,49 @@ class Product(Base):
             persisted=True,
         ),
         nullable=False,
+        # Нужен только в WHERE поиска: при загрузке товара не читается
+        deferred=True,
     )
 
-    __table_args__ = (Index("ix_products_tsv_gin", "tsv", postgresql_using="gin"),)
+    __table_args__ = (
+        Index("ix_products_tsv_gin", "tsv", postgresql_using="gin"),
+        # Индексы под keyset-пагинацию: (ключ сортировки, id)
+        Index("ix_products_price_id", "price", "id"),
+        Index("ix_products_rating_id", "rating", "id"),
+        Index("ix_products_created_at_id", "created_at", "id"),
+        # Подсказки по префиксу названия: LIKE 'префикс%' и сортировка по
+        # тому же выражению читаются из индекса без сортировки
+        Index(
+            "ix_products_name_prefix",
+            text('lower(name) COLLATE "C"'),
+            postgresql_where=text("is_active"),
+        ),
+    )
 
     cart_items: Mapped["CartItem"] = relationship(
         "CartItem",
         back_populates="product",
         cascade="all, delete-orphan",
     )
+
+
+def _trigram_available(ddl, target, bind, **kw) -> bool:
+    return bool(
+        bind.scalar(
+            text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        )
+    )
+
+
+# Подсказки с опечатками: триграммный индекс создаётся, только если
+# расширение pg_trgm есть на сервере, без него подсказки ищут по префиксу
+for _statement in (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products "
+    "USING gin (lower(name) gin_trgm_ops) WHERE is_active",
+):
+    event.listen(
+        Product.__table__,
+        "after_create",
+        DDL(_statement).execute_if(dialect="postgresql", callable_=_trigram_available),
+    )
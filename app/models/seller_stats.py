@@ -0,0 +1,35 @@
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import Date, ForeignKey, Index, Integer, Numeric
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class SellerDailyStats(Base):
+    """
+    Продажи продавца по товару за день (UTC). Поддерживается
+    инкрементально при оплате и отмене заказов, см. app/seller_stats.py.
+    """
+
+    __tablename__ = "seller_daily_stats"
+
+    seller_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    product_id: Mapped[int] = mapped_column(
+        ForeignKey("products.id", ondelete="CASCADE"), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    orders_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    units_sold: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    revenue: Mapped[Decimal] = mapped_column(
+        Numeric(14, 2), nullable=False, default=0
+    )
+
+    __table_args__ = (
+        # Первичный ключ обслуживает диапазон по дням для одного товара,
+        # этот индекс - диапазон по дням по всем товарам продавца
+        Index("ix_seller_daily_stats_seller_day", "seller_id", "day"),
+    )
@@ -0,0 +1,72 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_, asc, desc
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(sort: str, key: Any, last_id: int) -> str:
+    """
+    Упаковывает позицию (значение ключа сортировки, id) последней строки
+    страницы в непрозрачный для клиента курсор.
+    """
+    payload = {"s": sort, "k": _encode_value(key), "id": last_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str, sort: str, parse_key: Callable[[Any], Any] | None = None
+) -> tuple[Any, int]:
+    """
+    Распаковывает курсор и проверяет, что он выдан для той же сортировки.
+    """
+    invalid_cursor = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+    )
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload["s"] != sort:
+            raise invalid_cursor
+        key = payload["k"]
+        if parse_key is not None and key is not None:
+            key = parse_key(key)
+        return key, int(payload["id"])
+    except HTTPException:
+        raise
+    except (ValueError, KeyError, TypeError):
+        raise invalid_cursor
+
+
+def keyset_order(key_col, id_col, descending: bool) -> list:
+    """
+    ORDER BY для (ключ, id). Оба столбца идут в одном направлении,
+    чтобы Postgres мог пройти составной индекс (ключ, id) в любую сторону.
+    """
+    direction = desc if descending else asc
+    if key_col is None:
+        return [direction(id_col)]
+    return [direction(key_col), direction(id_col)]
+
+
+def keyset_filter(key_col, id_col, descending: bool, key: Any, last_id: int):
+    """
+    Условие "строго после курсора" для сортировки из keyset_order.
+    """
+    if key_col is None:
+        return id_col < last_id if descending else id_col > last_id
+    if descending:
+        return tuple_(key_col, id_col) < tuple_(key, last_id)
+    return tuple_(key_col, id_col) > tuple_(key, last_id)
@@ -0,0 +1,167 @@
+import re
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator
+
+from fastapi import Request
+from loguru import logger
+from app.config import (
+    QUERY_BUDGET,
+    QUERY_BUDGET_ACTION,
+    QUERY_REPEAT_THRESHOLD,
+)
+from app.metrics import query_trackers
+
+# Списки параметров IN (...) разной длины сводятся к одной форме
+_PLACEHOLDER = r"(?:\$\d+(?:::\w+)?|\?|%\(\w+\)s)"
+_IN_LIST_RE = re.compile(rf"IN \({_PLACEHOLDER}(?:, {_PLACEHOLDER})*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Запрос выполнил больше SQL-запросов, чем разрешено бюджетом.
+    """
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Нормализованный текст запроса: одинаковая форма у запросов, которые
+    различаются только значениями параметров.
+    """
+    return _IN_LIST_RE.sub("IN (...)", _WHITESPACE_RE.sub(" ", statement).strip())
+
+
+class QueryTracker:
+    """
+    Счётчик SQL-запросов одного HTTP-запроса или блока кода.
+    """
+
+    def __init__(self, budget: int = 0, raise_on_exceed: bool = False):
+        self.budget = budget
+        self.raise_on_exceed = raise_on_exceed
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Counter[str] = Counter()
+
+    def record(self, statement: str) -> None:
+        self.count += 1
+        self.statements[statement] += 1
+        if self.raise_on_exceed and self.over_budget:
+            raise QueryBudgetExceeded(
+                f"Query budget exceeded: {self.count} > {self.budget}"
+            )
+
+    @property
+    def over_budget(self) -> bool:
+        return 0 < self.budget < self.count
+
+    def repeated(
+        self, threshold: int = QUERY_REPEAT_THRESHOLD
+    ) -> list[tuple[str, int]]:
+        """
+        Формы запросов, выполненные не меньше threshold раз - признак N+1.
+        """
+        shapes: Counter[str] = Counter()
+        for statement, count in self.statements.items():
+            shapes[statement_shape(statement)] += count
+        return [
+            (shape, count)
+            for shape, count in shapes.most_common()
+            if count >= threshold
+        ]
+
+    def summary(self) -> str:
+        return (
+            f"count={self.count}, time_ms={self.seconds * 1000:.2f}, "
+            f"repeated={len(self.repeated())}"
+        )
+
+
+@contextmanager
+def track_queries(
+    budget: int = 0, raise_on_exceed: bool = False
+) -> Iterator[QueryTracker]:
+    """
+    Считает SQL-запросы, выполненные внутри блока (в том числе запросы
+    к ASGI-приложению через httpx.ASGITransport).
+    """
+    tracker = QueryTracker(budget, raise_on_exceed)
+    token = query_trackers.set(query_trackers.get() + (tracker,))
+    try:
+        yield tracker
+    finally:
+        query_trackers.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryTracker]:
+    """
+    Проверка для тестов: блок выполняет не больше limit SQL-запросов.
+
+        with assert_max_queries(2):
+            await client.get("/cart/cart", headers=headers)
+    """
+    with track_queries() as tracker:
+        yield tracker
+    if tracker.count > limit:
+        details = "\n".join(
+            f"  {count}x {shape}" for shape, count in tracker.repeated(2)
+        )
+        raise AssertionError(
+            f"Expected at most {limit} queries, got {tracker.count}"
+            + (f"\nRepeated:\n{details}" if details else "")
+        )
+
+
+def query_budget(limit: int):
+    """
+    Зависимость для маршрута с собственным бюджетом запросов:
+    dependencies=[Depends(query_budget(3))]. Действует только при QUERY_DEBUG.
+    """
+
+    async def set_budget(request: Request) -> None:
+        tracker = getattr(request.state, "query_tracker", None)
+        if tracker is not None:
+            tracker.budget = limit
+
+    return set_budget
+
+
+class QueryBudgetMiddleware:
+    """
+    Режим отладки: считает SQL-запросы каждого HTTP-запроса, пишет в лог
+    превышения бюджета и повторяющиеся формы запросов (N+1) и добавляет
+    заголовок X-Query-Summary.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tracker = QueryTracker(QUERY_BUDGET, QUERY_BUDGET_ACTION == "raise")
+        scope.setdefault("state", {})["query_tracker"] = tracker
+        token = query_trackers.set(query_trackers.get() + (tracker,))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-summary", tracker.summary().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            query_trackers.reset(token)
+            path = scope["path"]
+            if tracker.over_budget:
+                logger.warning(
+                    f"Query budget exceeded on {path}: {tracker.count} > {tracker.budget}"
+                )
+            for shape, count in tracker.repeated():
+                logger.warning(f"Possible N+1 on {path}: {count}x {shape}")
@@ -0,0 +1,89 @@
+from sqlalchemy import select, update, func, case, cast, Numeric
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.products import Product
+from app.models.reviews import Review
+
+GRADES = (1, 2, 3, 4, 5)
+
+
+def _grade_column(grade: int):
+    return getattr(Product, f"grade_{grade}_count")
+
+
+def _rating_expr(rating_sum, rating_count):
+    return case(
+        (rating_count > 0, cast(rating_sum, Numeric) / rating_count),
+        else_=0,
+    )
+
+
+async def apply_review_grade(
+    db: AsyncSession, product_id: int, grade: int, sign: int = 1
+) -> None:
+    """
+    Добавляет (sign=1) или убирает (sign=-1) оценку из счётчиков товара
+    одним UPDATE. Коммит остаётся за вызывающим, чтобы счётчики менялись
+    в той же транзакции, что и сам отзыв.
+    """
+    grade_col = _grade_column(grade)
+    new_sum = Product.rating_sum + sign * grade
+    new_count = Product.rating_count + sign
+    await db.execute(
+        update(Product)
+        .where(Product.id == product_id)
+        .values(
+            {
+                Product.rating_sum: new_sum,
+                Product.rating_count: new_count,
+                grade_col: grade_col + sign,
+                Product.rating: _rating_expr(new_sum, new_count),
+            }
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def recompute_ratings(db: AsyncSession) -> None:
+    """
+    Полностью пересчитывает счётчики всех товаров по активным отзывам.
+    Нужен для починки расхождений, в обычной работе не используется.
+    """
+    stats = (
+        select(
+            Review.product_id,
+            func.count().label("rating_count"),
+            func.sum(Review.grade).label("rating_sum"),
+            *(
+                func.count().filter(Review.grade == grade).label(f"grade_{grade}")
+                for grade in GRADES
+            ),
+        )
+        .where(Review.is_active)
+        .group_by(Review.product_id)
+        .subquery()
+    )
+    zeroes = {_grade_column(grade): 0 for grade in GRADES}
+    await db.execute(
+        update(Product)
+        .values(
+            {Product.rating_sum: 0, Product.rating_count: 0, Product.rating: 0, **zeroes}
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        update(Product)
+        .where(Product.id == stats.c.product_id)
+        .values(
+            {
+                Product.rating_sum: stats.c.rating_sum,
+                Product.rating_count: stats.c.rating_count,
+                Product.rating: _rating_expr(stats.c.rating_sum, stats.c.rating_count),
+                **{
+                    _grade_column(grade): stats.c[f"grade_{grade}"]
+                    for grade in GRADES
+                },
+            }
+        )
+        .execution_options(synchronize_session=False)
+    )
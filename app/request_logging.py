@@ -0,0 +1,217 @@
+import itertools
+import json
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from loguru import logger
+
+from app.config import (
+    LOG_FILE,
+    LOG_LEVEL,
+    LOG_QUEUE_SIZE,
+    LOG_RETENTION,
+    LOG_ROTATION,
+    LOG_SAMPLE_RATE,
+    LOG_SLOW_REQUEST_MS,
+)
+from app.metrics import LOG_RECORDS_DROPPED
+
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+# Идентификатор запроса без uuid4: префикс процесса и счётчик
+_PROCESS_PREFIX = os.urandom(4).hex()
+_request_counter = itertools.count(1)
+
+_request_logger = logger.bind(request_log=True).opt(raw=True)
+
+
+def new_request_id() -> str:
+    return f"{_PROCESS_PREFIX}-{next(_request_counter)}"
+
+
+class RequestLogWriter:
+    """
+    Пишет записи журнала запросов в отдельном потоке. Очередь ограничена:
+    при переполнении запись отбрасывается и учитывается в счётчике, а
+    обработка запроса не ждёт диска.
+    """
+
+    def __init__(self, max_queue: int):
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        self.written = 0
+        self.dropped = 0
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="request-log-writer", daemon=True
+            )
+            self._thread.start()
+
+    def emit(self, record: dict) -> None:
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.inc()
+
+    def _run(self) -> None:
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            # Форматирование и сериализация - уже вне event loop
+            record["ts"] = datetime.fromtimestamp(
+                record["ts"], timezone.utc
+            ).isoformat(timespec="milliseconds")
+            _request_logger.log(
+                record["level"].upper(),
+                json.dumps(record, ensure_ascii=False, default=str) + "\n",
+            )
+            self.written += 1
+
+    def shutdown(self) -> None:
+        """
+        Дописывает очередь и останавливает поток.
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
+
+request_log = RequestLogWriter(max_queue=LOG_QUEUE_SIZE)
+
+
+def setup_logging() -> None:
+    """
+    Журнал запросов - JSON-строки в LOG_FILE с ротацией; остальные
+    сообщения приложения - в stderr с идентификатором запроса.
+    """
+    logger.remove()
+    logger.configure(extra={"request_id": "-"})
+    logger.add(
+        sys.stderr,
+        level=LOG_LEVEL,
+        format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {level} | {extra[request_id]} | {message}",
+        filter=lambda record: "request_log" not in record["extra"],
+    )
+    logger.add(
+        LOG_FILE,
+        level="INFO",
+        format="{message}",
+        filter=lambda record: "request_log" in record["extra"],
+        rotation=LOG_ROTATION,
+        retention=LOG_RETENTION,
+    )
+    request_log.start()
+
+
+class RequestLoggingMiddleware:
+    """
+    Структурный журнал запросов. Ошибки и медленные запросы пишутся
+    всегда, успешные - с вероятностью LOG_SAMPLE_RATE. Идентификатор
+    запроса берётся из X-Request-ID или создаётся и возвращается в ответе.
+    Необработанное исключение превращается в ответ 500.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                value = value.decode("latin-1")
+                if _REQUEST_ID_RE.match(value):
+                    request_id = value
+                break
+        if request_id is None:
+            request_id = new_request_id()
+        scope.setdefault("state", {})["request_id"] = request_id
+
+        status = 500
+        response_started = False
+
+        async def send_wrapper(message):
+            nonlocal status, response_started
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_started = True
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        error = None
+        started = time.perf_counter()
+        with logger.contextualize(request_id=request_id):
+            try:
+                await self.app(scope, receive, send_wrapper)
+            except Exception as e:
+                if response_started:
+                    raise
+                error = e
+                await self._send_error(send_wrapper)
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        if status >= 500 or error is not None:
+            level = "error"
+        elif status >= 400:
+            level = "warning"
+        elif duration_ms >= LOG_SLOW_REQUEST_MS:
+            level = "warning"
+        elif random.random() < LOG_SAMPLE_RATE:
+            level = "info"
+        else:
+            return
+
+        route = scope.get("route")
+        record = {
+            "ts": time.time(),
+            "level": level,
+            "request_id": request_id,
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": getattr(route, "path", None),
+            "status": status,
+            "duration_ms": round(duration_ms, 3),
+            "client": scope["client"][0] if scope.get("client") else None,
+        }
+        if error is not None:
+            record["error"] = repr(error)
+        request_log.emit(record)
+
+    @staticmethod
+    async def _send_error(send) -> None:
+        body = b'{"success":false}'
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 500,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,242 @@
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Protocol
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from app.config import (
+    REPLICA_READ_YOUR_WRITES_SECONDS,
+    RESPONSE_CACHE_BACKEND,
+    RESPONSE_CACHE_MAX_BYTES,
+    RESPONSE_CACHE_TTL,
+)
+
+
+class CacheBackend(Protocol):
+    """
+    Хранилище готовых тел ответов. Методы асинхронные, чтобы за ним мог
+    стоять и сетевой кэш.
+    """
+
+    async def get(self, key: str) -> bytes | None: ...
+
+    async def set(
+        self, key: str, value: bytes, ttl: float, tags: Iterable[str]
+    ) -> None: ...
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> None: ...
+
+    async def clear(self) -> None: ...
+
+    def stats(self) -> dict[str, Any]: ...
+
+
+class InMemoryBackend:
+    """
+    LRU в памяти процесса, ограниченный суммарным размером тел ответов.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[float, bytes, tuple[str, ...]]] = (
+            OrderedDict()
+        )
+        self._tags: dict[str, set[str]] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def set(
+        self, key: str, value: bytes, ttl: float, tags: Iterable[str]
+    ) -> None:
+        if len(value) > self.max_bytes:
+            return
+        self._remove(key)
+        tags = tuple(tags)
+        self._entries[key] = (time.monotonic() + ttl, value, tags)
+        self.size += len(value)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            for key in self._tags.pop(tag, ()):
+                self._remove(key)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._tags.clear()
+        self.size = 0
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= len(entry[1])
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
+class NullBackend:
+    """
+    Отключённый кэш: ничего не хранит.
+    """
+
+    async def get(self, key: str) -> bytes | None:
+        return None
+
+    async def set(
+        self, key: str, value: bytes, ttl: float, tags: Iterable[str]
+    ) -> None:
+        pass
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> None:
+        pass
+
+    async def clear(self) -> None:
+        pass
+
+    def stats(self) -> dict[str, Any]:
+        return {}
+
+
+BACKENDS = {
+    "memory": lambda: InMemoryBackend(max_bytes=RESPONSE_CACHE_MAX_BYTES),
+    "none": NullBackend,
+}
+
+
+class ResponseCache:
+    """
+    Кэш сериализованных ответов публичных GET-эндпоинтов каталога.
+
+    Ключ - путь плюс нормализованная строка запроса. Каждая запись
+    помечается тегами, по которым обработчики записи её сбрасывают.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Растёт при каждой инвалидации: ответ, начатый до записи,
+        # не должен попасть в кэш после неё
+        self._generation = 0
+        self._invalidated_at = 0.0
+        self._adapters: dict[Any, TypeAdapter] = {}
+
+    @staticmethod
+    def make_key(request: Request) -> str:
+        query = sorted(request.query_params.multi_items())
+        return request.url.path + "?" + urlencode(query)
+
+    async def get(self, request: Request) -> Response | None:
+        body = await self.backend.get(self.make_key(request))
+        if body is None:
+            self.misses += 1
+            request.state.response_cache_generation = self._generation
+            return None
+        self.hits += 1
+        return Response(content=body, media_type="application/json")
+
+    async def store(
+        self,
+        request: Request,
+        response_model: Any,
+        value: Any,
+        tags: Iterable[str],
+        ttl: float | None = None,
+    ) -> Response:
+        """
+        Сериализует value по схеме ответа так же, как это сделал бы FastAPI,
+        кладёт результат в кэш и возвращает готовый ответ.
+        """
+        body = self.serialize(response_model, value)
+        return await self.store_body(request, body, tags, ttl)
+
+    async def store_body(
+        self,
+        request: Request,
+        body: bytes,
+        tags: Iterable[str],
+        ttl: float | None = None,
+    ) -> Response:
+        """
+        Кладёт в кэш уже сериализованное тело ответа (быстрый путь без
+        pydantic) и возвращает готовый ответ.
+        """
+        generation = getattr(request.state, "response_cache_generation", None)
+        # Реплика может ещё не содержать недавнюю запись - такой ответ
+        # не кэшируем, иначе устаревшие данные проживут весь TTL
+        lagging = (
+            getattr(request.state, "read_replica", False)
+            and time.monotonic() - self._invalidated_at
+            < REPLICA_READ_YOUR_WRITES_SECONDS
+        )
+        if generation == self._generation and not lagging:
+            await self.backend.set(
+                self.make_key(request), body, self.ttl if ttl is None else ttl, tags
+            )
+        return Response(content=body, media_type="application/json")
+
+    def serialize(self, response_model: Any, value: Any) -> bytes:
+        """
+        Тело ответа по схеме response_model, без записи в кэш.
+        """
+        adapter = self._adapters.get(response_model)
+        if adapter is None:
+            adapter = self._adapters[response_model] = TypeAdapter(response_model)
+        return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+    async def invalidate(self, *tags: str) -> None:
+        self._generation += 1
+        self._invalidated_at = time.monotonic()
+        await self.backend.invalidate_tags(tags)
+
+    def stats(self) -> dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, **self.backend.stats()}
+
+
+# Теги записей каталога
+PRODUCT_LISTS_TAG = "products:list"
+CATEGORIES_TAG = "categories"
+CATEGORY_DEPENDENT_TAG = "categories:dependent"
+
+
+def product_tag(product_id: int) -> str:
+    return f"product:{product_id}"
+
+
+def category_products_tag(category_id: int) -> str:
+    return f"products:category:{category_id}"
+
+
+response_cache = ResponseCache(
+    backend=BACKENDS[RESPONSE_CACHE_BACKEND](), ttl=RESPONSE_CACHE_TTL
+)
@@ -1,10 +1,9 @@
-from decimal import Decimal
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status, Response
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, update, func, cast, literal, Integer, Numeric
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 from app.auth import get_current_user
 from app.db_depends import get_async_db
@@ -13,43 +12,97 @@ from app.models.products import Product
 from app.models.users import User as UserModel
 from app.schemas import (
     Cart as CartSchema,
+    CartBatchUpdate,
     CartItem as CartItemSchema,
     CartItemCreate,
     CartItemUpdate,
+    ProductSheme,
 )
 
 router = APIRouter(prefix="/cart", tags=["cart"])
 
+# Только поля ответа: без tsv и счётчиков рейтинга
+PRODUCT_COLUMNS = [getattr(Product, name) for name in ProductSheme.model_fields]
 
-async def _ensure_product_available(db: AsyncSession, product_id: int) -> None:
+
+def _on_conflict(stmt, replace: bool):
     """
-    Проверка на то, что в базе есть продукт с указанным id
+    ON CONFLICT (user_id, product_id) DO UPDATE для вставки в корзину:
+    replace=False прибавляет количество к уже лежащему в корзине,
+    replace=True задаёт его.
     """
-    result = await db.scalars(
-        select(Product).where(Product.id == product_id, Product.is_active == True)
+    quantity = stmt.excluded.quantity
+    if not replace:
+        quantity = CartItemModel.quantity + quantity
+    return stmt.on_conflict_do_update(
+        index_elements=[CartItemModel.user_id, CartItemModel.product_id],
+        set_={"quantity": quantity, "updated_at": func.now()},
     )
-    product = result.first()
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
+
+
+async def _cart_item_response(db: AsyncSession, stmt) -> dict | None:
+    """
+    Выполняет изменяющий запрос с RETURNING и в том же запросе (через CTE)
+    подтягивает данные товара для ответа.
+    """
+    changed = stmt.returning(
+        CartItemModel.id, CartItemModel.quantity, CartItemModel.product_id
+    ).cte("changed")
+    row = (
+        await db.execute(
+            select(
+                changed.c.id.label("item_id"),
+                changed.c.quantity.label("item_quantity"),
+                *PRODUCT_COLUMNS,
+            ).join(Product, Product.id == changed.c.product_id)
         )
+    ).first()
+    if row is None:
+        return None
+    item = row._mapping
+    return {
+        "id": item["item_id"],
+        "quantity": item["item_quantity"],
+        "product": {column.key: item[column.key] for column in PRODUCT_COLUMNS},
+    }
 
 
-async def _get_cart_item(
-    db: AsyncSession, user_id: int, product_id: int
-) -> CartItemModel | None:
+async def _load_cart(db: AsyncSession, user_id: int) -> dict:
     """
-    Получение item из корзины согласно пользовательскому id и id продукта
+    Содержимое корзины и итоги одним запросом: количество и стоимость
+    считаются в SQL оконными функциями.
     """
-    result = await db.scalars(
-        select(CartItemModel)
-        .options(selectinload(CartItemModel.product))
-        .where(
-            CartItemModel.user_id == user_id,
-            CartItemModel.id == product_id,
+    line_price = cast(Product.price, Numeric) * CartItemModel.quantity
+    rows = (
+        await db.execute(
+            select(
+                CartItemModel.id.label("item_id"),
+                CartItemModel.quantity.label("item_quantity"),
+                *PRODUCT_COLUMNS,
+                func.sum(CartItemModel.quantity).over().label("total_quantity"),
+                func.sum(line_price).over().label("total_price"),
+            )
+            .join(Product, Product.id == CartItemModel.product_id)
+            .where(CartItemModel.user_id == user_id)
+            .order_by(CartItemModel.id)
         )
-    )
-    return result.first()
+    ).all()
+    items = [
+        {
+            "id": row.item_id,
+            "quantity": row.item_quantity,
+            "product": {
+                column.key: row._mapping[column.key] for column in PRODUCT_COLUMNS
+            },
+        }
+        for row in rows
+    ]
+    return {
+        "user_id": user_id,
+        "items": items,
+        "total_quantity": rows[0].total_quantity if rows else 0,
+        "total_price": rows[0].total_price if rows else 0,
+    }
 
 
 @router.get("/cart", response_model=CartSchema, status_code=status.HTTP_200_OK)
@@ -57,30 +110,7 @@ async def get_cart(
     db: Annotated[AsyncSession, Depends(get_async_db)],
     current_user: Annotated[UserModel, Depends(get_current_user)],
 ):
-    result = await db.scalars(
-        select(CartItemModel)
-        .options(selectinload(CartItemModel.product))
-        .where(CartItemModel.user_id == current_user.id)
-        .order_by(CartItemModel.id)
-    )
-
-    items = result.all()
-
-    total_quantity = sum(item.quantity for item in items)
-    price_items = (
-        Decimal(item.quantity)
-        * (item.product.price if item.product.price is not None else Decimal("0"))
-        for item in items
-    )
-
-    total_price_decimal = sum(price_items, Decimal("0"))
-
-    return CartSchema(
-        user_id=current_user.id,
-        items=items,
-        total_quantity=total_quantity,
-        total_price=total_price_decimal,
-    )
+    return await _load_cart(db, current_user.id)
 
 
 @router.post(
@@ -91,22 +121,26 @@ async def add_item_to_cart(
     db: Annotated[AsyncSession, Depends(get_async_db)],
     current_user: Annotated[UserModel, Depends(get_current_user)],
 ):
-    await _ensure_product_available(db, product_id=payload.product_id)
-
-    cart_item = await _get_cart_item(db, current_user.id, payload.product_id)
-    if cart_item:
-        cart_item.quantity += payload.quantity
-    else:
-        cart_item = CartItemModel(
-            user_id=current_user.id,
-            product_id=payload.product_id,
-            quantity=cart_item.quantity,
+    """
+    Добавляет товар в корзину или увеличивает его количество - одним
+    запросом, без гонки между параллельными добавлениями.
+    """
+    # INSERT ... SELECT: строка появляется, только если товар активен
+    source = select(
+        literal(current_user.id, Integer),
+        Product.id,
+        literal(payload.quantity, Integer),
+    ).where(Product.id == payload.product_id, Product.is_active == True)
+    stmt = insert(CartItemModel).from_select(
+        ["user_id", "product_id", "quantity"], source
+    )
+    item = await _cart_item_response(db, _on_conflict(stmt, replace=False))
+    if item is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
         )
-        db.add(cart_item)
-
     await db.commit()
-    updated_item = await _get_cart_item(db, current_user.id, payload.product_id)
-    return updated_item
+    return item
 
 
 @router.put(
@@ -118,17 +152,92 @@ async def update_item_to_cart(
     db: Annotated[AsyncSession, Depends(get_async_db)],
     current_user: Annotated[UserModel, Depends(get_current_user)],
 ):
-    await _ensure_product_available(db, product_id=product_id)
-    cart_item = await _get_cart_item(db, current_user.id, payload.product_id)
-    if not cart_item:
+    item = await _cart_item_response(
+        db,
+        update(CartItemModel)
+        .where(
+            CartItemModel.user_id == current_user.id,
+            CartItemModel.product_id == product_id,
+        )
+        .values(quantity=payload.quantity, updated_at=func.now()),
+    )
+    if item is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Item not found"
         )
+    await db.commit()
+    return item
+
 
-    cart_item.quantity = payload.quantity
+@router.patch("/items", response_model=CartSchema, status_code=status.HTTP_200_OK)
+async def update_cart_items(
+    payload: CartBatchUpdate,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    current_user: Annotated[UserModel, Depends(get_current_user)],
+):
+    """
+    Применяет набор операций add/set/remove одной транзакцией и
+    возвращает корзину целиком. Операции над одним товаром сворачиваются
+    по порядку, поэтому в БД уходит не больше трёх изменяющих запросов.
+    """
+    # product_id -> ("add" | "set" | "remove", количество)
+    changes: dict[int, tuple[str, int]] = {}
+    for operation in payload.operations:
+        if operation.op != "remove" and operation.quantity is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"quantity is required for {operation.op}",
+            )
+        previous = changes.get(operation.product_id)
+        if operation.op == "add" and previous is not None:
+            kind, quantity = previous
+            if kind == "remove":
+                changes[operation.product_id] = ("set", operation.quantity)
+            else:
+                changes[operation.product_id] = (kind, quantity + operation.quantity)
+        else:
+            changes[operation.product_id] = (operation.op, operation.quantity or 0)
+
+    added = {pid: q for pid, (kind, q) in changes.items() if kind == "add"}
+    replaced = {pid: q for pid, (kind, q) in changes.items() if kind == "set"}
+    removed = [pid for pid, (kind, _) in changes.items() if kind == "remove"]
+
+    if added or replaced:
+        wanted = added.keys() | replaced.keys()
+        available = set(
+            await db.scalars(
+                select(Product.id).where(
+                    Product.id.in_(wanted), Product.is_active == True
+                )
+            )
+        )
+        missing = sorted(wanted - available)
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Products not found: {missing}",
+            )
+
+    if removed:
+        await db.execute(
+            delete(CartItemModel).where(
+                CartItemModel.user_id == current_user.id,
+                CartItemModel.product_id.in_(removed),
+            )
+        )
+    for quantities, replace in ((added, False), (replaced, True)):
+        if quantities:
+            # Строки по возрастанию product_id: одинаковый порядок блокировок
+            # у параллельных пакетов не даёт взаимоблокировок
+            stmt = insert(CartItemModel).values(
+                [
+                    {"user_id": current_user.id, "product_id": pid, "quantity": q}
+                    for pid, q in sorted(quantities.items())
+                ]
+            )
+            await db.execute(_on_conflict(stmt, replace))
     await db.commit()
-    updated_item = await _get_cart_item(db, current_user.id, payload.product_id)
-    return updated_item
+    return await _load_cart(db, current_user.id)
 
 
 @router.delete("/items/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -137,15 +246,18 @@ async def delete_item_from_cart(
     db: Annotated[AsyncSession, Depends(get_async_db)],
     current_user: Annotated[UserModel, Depends(get_current_user)],
 ):
-    await _ensure_product_available(db, product_id=product_id)
-
-    cart_item = await _get_cart_item(db, current_user.id, product_id)
-    if not cart_item:
+    deleted = await db.scalar(
+        delete(CartItemModel)
+        .where(
+            CartItemModel.user_id == current_user.id,
+            CartItemModel.product_id == product_id,
+        )
+        .returning(CartItemModel.id)
+    )
+    if deleted is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Item not found"
         )
-
-    await db.delete(cart_item)
     await db.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
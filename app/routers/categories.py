@@ -1,26 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy import select, update, and_
-from sqlalchemy.orm import Session
 from typing import Annotated, List
 
+from app.category_tree import category_tree
+from app.fast_json import dump_json, rows_to_dicts
 from app.models.categories import Category as CategoryModel
-from app.schemas import Category as CategorySchema, CategoryCreate
-from app.db_depends import get_db, get_async_db
+from app.models.products import Product
+from app.schemas import Category as CategorySchema, CategoryCreate, CategoryTreeNode
+from app.response_cache import (
+    CATEGORIES_TAG,
+    CATEGORY_DEPENDENT_TAG,
+    PRODUCT_LISTS_TAG,
+    response_cache,
+)
+from app.search_cache import bump_catalog_version
+from app.totals import invalidate_totals
+from app.db_depends import get_async_db, get_read_db
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db_depends import get_async_db
-
 router = APIRouter(
     prefix="/categories",
     tags=["categories"],
 )
 
+CATEGORY_FIELDS = tuple(CategorySchema.model_fields)
+
 
 @router.get("/", response_model=List[CategorySchema], status_code=status.HTTP_200_OK)
-async def get_all_categories(db: Annotated[AsyncSession, Depends(get_async_db)]):
-    result = await db.scalars(select(CategoryModel).where(CategoryModel.is_active))
-    categories = result.all()
-    return categories
+async def get_all_categories(
+    request: Request, db: Annotated[AsyncSession, Depends(get_read_db)]
+):
+    cached = await response_cache.get(request)
+    if cached is not None:
+        return cached
+    stmt = select(*(getattr(CategoryModel, name) for name in CATEGORY_FIELDS)).where(
+        CategoryModel.is_active
+    )
+    rows = (await db.execute(stmt)).all()
+    return await response_cache.store_body(
+        request, dump_json(rows_to_dicts(rows, CATEGORY_FIELDS)), tags=[CATEGORIES_TAG]
+    )
+
+
+@router.get(
+    "/tree", response_model=List[CategoryTreeNode], status_code=status.HTTP_200_OK
+)
+async def get_category_tree(db: Annotated[AsyncSession, Depends(get_read_db)]):
+    """
+    Дерево активных категорий с количеством активных товаров в каждом узле.
+    """
+    tree = await category_tree.get(db)
+    return tree.roots
+
+
+async def _invalidate_category_caches() -> None:
+    # Состав поддеревьев меняет и фильтр category_id у товаров
+    category_tree.invalidate()
+    invalidate_totals(Product.__tablename__)
+    bump_catalog_version()
+    await response_cache.invalidate(
+        CATEGORIES_TAG, PRODUCT_LISTS_TAG, CATEGORY_DEPENDENT_TAG
+    )
 
 
 @router.post(
@@ -39,6 +79,7 @@ async def create_category(
     db_category = CategoryModel(**category.model_dump())
     db.add(db_category)
     await db.commit()
+    await _invalidate_category_caches()
     await db.refresh(db_category)
     return db_category
 
@@ -56,7 +97,7 @@ async def update_category(
     )
     result = await db.scalars(stmt)
     db_category = result.first()
-    if category is None:
+    if db_category is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Category does not exist"
         )
@@ -70,17 +111,26 @@ async def update_category(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Parent category does not exist",
             )
-
-        await db.execute(
-            update(CategoryModel)
-            .where(
-                category_id == CategoryModel.id,
+        # Родитель из собственного поддерева замкнул бы цикл, и его узлы
+        # выпали бы из дерева категорий
+        tree = await category_tree.get(db)
+        if category.parent_id in tree.subtree_ids(category_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Category cannot be moved under itself or its descendant",
             )
-            .values(**category.model_dump())
+
+    await db.execute(
+        update(CategoryModel)
+        .where(
+            category_id == CategoryModel.id,
         )
-        await db.commit()
-        await db.refresh(db_category)
-        return db_category
+        .values(**category.model_dump())
+    )
+    await db.commit()
+    await _invalidate_category_caches()
+    await db.refresh(db_category)
+    return db_category
 
 
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -103,4 +153,5 @@ async def delete_category(
         .values(is_active=False)
     )
     await db.commit()
+    await _invalidate_category_caches()
     return {"status": "success", "message": "Category marked as inactive"}
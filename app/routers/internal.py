@@ -0,0 +1,58 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, status
+
+from app.auth import get_current_admin, password_pool
+from app.database import async_engine, pool_stats, replicas
+from app.models.users import User as UserModel
+from app.request_logging import request_log
+from app.response_cache import response_cache
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["internal"],
+)
+
+
+@router.get("/auth/password-pool", status_code=status.HTTP_200_OK)
+async def get_password_pool_stats(
+    current_user: Annotated[UserModel, Depends(get_current_admin)],
+):
+    """
+    Состояние пула хеширования паролей: занятые воркеры, глубина очереди,
+    отказы.
+    """
+    return password_pool.stats()
+
+
+@router.get("/cache", status_code=status.HTTP_200_OK)
+async def get_response_cache_stats(
+    current_user: Annotated[UserModel, Depends(get_current_admin)],
+):
+    """
+    Попадания и промахи кэша ответов каталога, занятая память, вытеснения.
+    """
+    return response_cache.stats()
+
+
+@router.get("/db/pool", status_code=status.HTTP_200_OK)
+async def get_db_pool_stats(
+    current_user: Annotated[UserModel, Depends(get_current_admin)],
+):
+    """
+    Состояние пула соединений: занятые соединения, overflow, ожидание
+    выдачи соединения. По этим цифрам подбирается число воркеров под
+    max_connections Postgres. Для реплик - те же цифры и признак
+    недоступности.
+    """
+    return {"primary": pool_stats(async_engine), "replicas": replicas.stats()}
+
+
+@router.get("/logging", status_code=status.HTTP_200_OK)
+async def get_request_log_stats(
+    current_user: Annotated[UserModel, Depends(get_current_admin)],
+):
+    """
+    Очередь журнала запросов: записано, ожидает записи, отброшено.
+    """
+    return request_log.stats()
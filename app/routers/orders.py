@@ -1,26 +1,55 @@
-from typing import List
+from typing import Annotated
 
 from fastapi import APIRouter, Depends, Query, HTTPException, status as status_code
-from sqlalchemy import select, func
+from sqlalchemy import (
+    Integer,
+    Numeric,
+    cast,
+    column,
+    delete,
+    func,
+    literal,
+    select,
+    true,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth import get_current_admin, get_current_user
+from app.database import async_session_maker
 from app.db_depends import get_async_db
-from app.models.orders import Order as OrderModel
-from app.schemas import Order as OrderSchema
+from app.export import EXPORT_FORMATS_PATTERN, export_response
+from app.models.cart_items import CartItem as CartItemModel
+from app.models.orders import Order as OrderModel, order_products
+from app.models.products import Product
+from app.models.users import User as UserModel
+from app.pagination import decode_cursor, encode_cursor, keyset_filter, keyset_order
+from app.schemas import (
+    Order as OrderSchema,
+    OrderHistory,
+    OrderList,
+    OrderStatusUpdate,
+    OrderWithLines,
+)
+from app.search_cache import bump_catalog_version
+from app.seller_stats import apply_order_stats
+from app.totals import TOTAL_MODES_PATTERN, count_total, invalidate_totals
 
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
+# Новый статус -> статусы, из которых в него можно перейти
+STATUS_TRANSITIONS = {
+    "paid": ("in process",),
+    "canceled": ("in process", "paid"),
+}
 
-@router.get("/", response_model=List[OrderSchema])
-async def get_orders(
-    db: AsyncSession = Depends(get_async_db),
-    page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100),
-    status: str | None = Query(None, regex="^(paid|in process|canceled)$"),
-    min_price: float | None = Query(None, gt=0),
-    max_price: float | None = Query(None, gt=0),
-):
-    if max_price is not None and min_price is not None and max_price < max_price:
+
+def _build_order_filters(
+    status: str | None, min_price: float | None, max_price: float | None
+) -> list:
+    if max_price is not None and min_price is not None and max_price < min_price:
         raise HTTPException(
             status_code=status_code.HTTP_400_BAD_REQUEST,
             detail=f"max_price={max_price} min_price={min_price}"
@@ -35,9 +64,33 @@ async def get_orders(
         filters.append(OrderModel.total_price >= min_price)
     if max_price is not None:
         filters.append(OrderModel.total_price <= max_price)
+    return filters
+
 
-    total_stmt = select(func.count()).select_from(OrderModel).where(*filters)
-    total = await db.scalar(total_stmt)
+@router.get("/", response_model=OrderList)
+async def get_orders(
+    current_user: Annotated[UserModel, Depends(get_current_admin)],
+    db: AsyncSession = Depends(get_async_db),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    status: str | None = Query(None, regex="^(paid|in process|canceled)$"),
+    min_price: float | None = Query(None, gt=0),
+    max_price: float | None = Query(None, gt=0),
+    total_mode: str = Query(
+        "exact",
+        pattern=TOTAL_MODES_PATTERN,
+        description="Подсчёт total: exact, cached или estimate",
+    ),
+):
+    filters = _build_order_filters(status, min_price, max_price)
+
+    total, total_mode = await count_total(
+        db,
+        OrderModel,
+        filters,
+        {"status": status, "min_price": min_price, "max_price": max_price},
+        total_mode,
+    )
 
     order_stmt = (
         select(OrderModel)
@@ -50,6 +103,308 @@ async def get_orders(
     return {
         "items": response.all(),
         "total": total,
+        "total_mode": total_mode,
         "page": page,
         "page_size": page_size,
     }
+
+
+@router.get("/me", response_model=OrderHistory)
+async def get_my_orders(
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    current_user: Annotated[UserModel, Depends(get_current_user)],
+    page_size: int = Query(20, ge=1, le=100),
+    status: str | None = Query(None, pattern="^(paid|in process|canceled)$"),
+    cursor: str | None = Query(
+        None, description="Курсор следующей страницы (next_cursor из ответа)"
+    ),
+):
+    """
+    История заказов текущего пользователя, новые первыми. Страница
+    читается по индексу (user_id, status, id) и вместе с позициями
+    заказов занимает два запроса при любом объёме истории.
+    """
+    stmt = select(*(getattr(OrderModel, name) for name in OrderSchema.model_fields))
+    stmt = stmt.where(
+        OrderModel.user_id == current_user.id, OrderModel.is_active == True
+    )
+    if status is not None:
+        stmt = stmt.where(OrderModel.status == status)
+    if cursor is not None:
+        _, last_id = decode_cursor(cursor, "id")
+        stmt = stmt.where(keyset_filter(None, OrderModel.id, True, None, last_id))
+    stmt = stmt.order_by(*keyset_order(None, OrderModel.id, True))
+    # Лишняя строка показывает, есть ли следующая страница
+    orders = (await db.execute(stmt.limit(page_size + 1))).all()
+
+    next_cursor = None
+    if len(orders) > page_size:
+        orders = orders[:page_size]
+        next_cursor = encode_cursor("id", None, orders[-1].id)
+
+    lines_by_order: dict[int, list] = {row.id: [] for row in orders}
+    if orders:
+        lines = await db.execute(
+            select(
+                order_products.c.order_id,
+                order_products.c.product_id,
+                order_products.c.quantity,
+                order_products.c.unit_price,
+            )
+            .where(order_products.c.order_id.in_(lines_by_order))
+            .order_by(order_products.c.order_id, order_products.c.id)
+        )
+        for line in lines:
+            lines_by_order[line.order_id].append(line._mapping)
+
+    return {
+        "items": [
+            {**row._mapping, "lines": lines_by_order[row.id]} for row in orders
+        ],
+        "page_size": page_size,
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/export")
+async def export_orders(
+    current_user: Annotated[UserModel, Depends(get_current_admin)],
+    format: str = Query("ndjson", pattern=EXPORT_FORMATS_PATTERN),
+    status: str | None = Query(None, pattern="^(paid|in process|canceled)$"),
+    min_price: float | None = Query(None, gt=0),
+    max_price: float | None = Query(None, gt=0),
+):
+    """
+    Выгрузка истории заказов потоком NDJSON или CSV (только администраторы).
+    """
+    filters = _build_order_filters(status, min_price, max_price)
+    stmt = (
+        select(*(getattr(OrderModel, name) for name in OrderSchema.model_fields))
+        .where(*filters)
+        .order_by(OrderModel.id)
+    )
+    return export_response(async_session_maker, stmt, format, "orders")
+
+
+def _invalidate_stock_filters() -> None:
+    # Товар закончился или снова появился: меняются total и выдача поиска
+    # с фильтром in_stock. Пока остаток не пересекает ноль, фильтры те же
+    invalidate_totals(Product.__tablename__)
+    bump_catalog_version()
+
+
+@router.post(
+    "/checkout",
+    response_model=OrderWithLines,
+    status_code=status_code.HTTP_201_CREATED,
+)
+async def checkout(
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    current_user: Annotated[UserModel, Depends(get_current_user)],
+):
+    """
+    Оформляет корзину в заказ одной транзакцией из трёх запросов.
+
+    Строки товаров блокируются только на последнем шаге (списание
+    остатков) и до коммита, поэтому параллельные заказы одного и того же
+    товара почти не ждут друг друга.
+    """
+    # 1. Забираем корзину целиком: параллельное оформление той же корзины
+    # получит пустой результат. Цены фиксируются на этот момент.
+    cart_rows = (
+        await db.execute(
+            delete(CartItemModel)
+            .where(
+                CartItemModel.user_id == current_user.id,
+                CartItemModel.product_id == Product.id,
+                Product.is_active == True,
+            )
+            .returning(
+                CartItemModel.product_id,
+                CartItemModel.quantity,
+                cast(Product.price, Numeric(12, 2)).label("unit_price"),
+            )
+        )
+    ).all()
+    if not cart_rows:
+        raise HTTPException(
+            status_code=status_code.HTTP_400_BAD_REQUEST, detail="Cart is empty"
+        )
+    lines = (
+        values(
+            column("product_id", Integer),
+            column("quantity", Integer),
+            column("unit_price", Numeric(12, 2)),
+            name="lines",
+        )
+        .data(sorted(tuple(row) for row in cart_rows))
+    )
+
+    # 2. Заказ и его позиции одним запросом; сумма считается в SQL
+    new_order = (
+        insert(OrderModel)
+        .from_select(
+            ["user_id", "status", "total_price"],
+            select(
+                literal(current_user.id, Integer),
+                literal("in process"),
+                func.sum(lines.c.quantity * lines.c.unit_price),
+            ),
+        )
+        .returning(
+            OrderModel.id,
+            OrderModel.user_id,
+            OrderModel.total_price,
+            OrderModel.status,
+            OrderModel.is_active,
+        )
+        .cte("new_order")
+    )
+    new_lines = (
+        insert(order_products)
+        .from_select(
+            ["order_id", "product_id", "quantity", "unit_price"],
+            select(
+                new_order.c.id, lines.c.product_id, lines.c.quantity, lines.c.unit_price
+            ).join_from(new_order, lines, true()),
+        )
+        .returning(order_products.c.order_id)
+        .cte("new_lines")
+    )
+    order = (await db.execute(select(new_order).add_cte(new_lines))).one()
+
+    # 3. Списание остатков. Строки товаров блокируются по возрастанию id
+    # (подзапрос FOR NO KEY UPDATE), чтобы заказы с несколькими общими
+    # товарами не устраивали взаимоблокировок. FOR UPDATE здесь нельзя: он
+    # конфликтует с KEY SHARE, который уже взяла проверка внешнего ключа
+    # order_products на шаге 2. stock >= quantity не даёт уйти в минус.
+    locked = (
+        select(Product.id)
+        .where(Product.id.in_([row.product_id for row in cart_rows]))
+        .order_by(Product.id)
+        .with_for_update(key_share=True)
+        .subquery("locked")
+    )
+    remaining = dict(
+        (
+            await db.execute(
+                update(Product)
+                .where(
+                    Product.id == locked.c.id,
+                    Product.id == lines.c.product_id,
+                    Product.stock >= lines.c.quantity,
+                )
+                .values(stock=Product.stock - lines.c.quantity)
+                .returning(Product.id, Product.stock)
+            )
+        ).all()
+    )
+    short = sorted({row.product_id for row in cart_rows} - remaining.keys())
+    if short:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status_code.HTTP_409_CONFLICT,
+            detail=f"Not enough stock for products: {short}",
+        )
+    await db.commit()
+    invalidate_totals(OrderModel.__tablename__)
+    if 0 in remaining.values():
+        _invalidate_stock_filters()
+
+    # Кэш ответов каталога намеренно не сбрасываем: оформление - самая
+    # частая запись. Остаток в кэшированных списках, карточках и фасетах
+    # анонимных ответов отстаёт не больше чем на RESPONSE_CACHE_TTL.
+    # Источник правды для остатка - само списание выше.
+    return {
+        **order._mapping,
+        "lines": [row._mapping for row in sorted(cart_rows)],
+    }
+
+
+@router.patch("/{order_id}/status", response_model=OrderSchema)
+async def update_order_status(
+    order_id: int,
+    payload: OrderStatusUpdate,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    current_user: Annotated[UserModel, Depends(get_current_admin)],
+):
+    """
+    Оплата или отмена заказа (только администраторы).
+
+    Переход проверяется в самом UPDATE, поэтому повторная или
+    параллельная смена статуса не учтётся в статистике продавцов дважды.
+    Оплата добавляет позиции в статистику за день оплаты, отмена
+    оплаченного заказа вычитает их оттуда же. Отмена возвращает остатки.
+    """
+    new_status = payload.status
+    changes = {OrderModel.status: new_status}
+    if new_status == "paid":
+        changes[OrderModel.paid_at] = func.now()
+    order = (
+        await db.execute(
+            update(OrderModel)
+            .where(
+                OrderModel.id == order_id,
+                OrderModel.is_active == True,
+                OrderModel.status.in_(STATUS_TRANSITIONS[new_status]),
+            )
+            .values(changes)
+            .returning(
+                *(getattr(OrderModel, name) for name in OrderSchema.model_fields)
+            )
+        )
+    ).one_or_none()
+    if order is None:
+        current_status = await db.scalar(
+            select(OrderModel.status).where(
+                OrderModel.id == order_id, OrderModel.is_active == True
+            )
+        )
+        if current_status is None:
+            raise HTTPException(
+                status_code=status_code.HTTP_404_NOT_FOUND, detail="Order not found"
+            )
+        raise HTTPException(
+            status_code=status_code.HTTP_409_CONFLICT,
+            detail=f"Cannot change order status from '{current_status}' "
+            f"to '{new_status}'",
+        )
+
+    back_in_stock = False
+    if new_status == "paid":
+        await apply_order_stats(db, order_id)
+    else:
+        # paid_at остаётся и после отмены: по нему находится день, из
+        # которого нужно вычесть продажи
+        if order.paid_at is not None:
+            await apply_order_stats(db, order_id, sign=-1)
+        lines = (
+            select(
+                order_products.c.product_id,
+                func.sum(order_products.c.quantity).label("quantity"),
+            )
+            .where(order_products.c.order_id == order_id)
+            .group_by(order_products.c.product_id)
+            .subquery("lines")
+        )
+        # Тот же порядок блокировок, что и при оформлении заказа
+        locked = (
+            select(Product.id)
+            .where(Product.id.in_(select(lines.c.product_id)))
+            .order_by(Product.id)
+            .with_for_update(key_share=True)
+            .subquery("locked")
+        )
+        restocked = await db.execute(
+            update(Product)
+            .where(Product.id == locked.c.id, Product.id == lines.c.product_id)
+            .values(stock=Product.stock + lines.c.quantity)
+            .returning(Product.stock, lines.c.quantity)
+        )
+        back_in_stock = any(stock == quantity for stock, quantity in restocked)
+    await db.commit()
+    # Заказ перешёл в другой статус - total с фильтром status= устарели
+    invalidate_totals(OrderModel.__tablename__)
+    if back_in_stock:
+        _invalidate_stock_filters()
+    return order._mapping
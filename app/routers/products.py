@@ -1,17 +1,61 @@
-from typing import List, Annotated
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, List, Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select, and_, update, func, desc
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import ValidationError
+from sqlalchemy import select, and_, update, func, insert
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 from app.auth import get_current_seller
-from app.db_depends import get_async_db
+from app.bulk_import import RowError, iter_rows
+from app.category_tree import category_tree
+from app.config import BULK_IMPORT_CHUNK_SIZE, BULK_IMPORT_MAX_ERRORS, SUGGEST_LIMIT
+from app.db_depends import get_async_db, get_read_db, read_session_maker
+from app.export import EXPORT_FORMATS_PATTERN, export_response
+from app.facets import FACETS_PATTERN, compute_facets, parse_facets
+from app.fast_json import dump_json, json_response, rows_to_dicts
+from app.fields import (
+    PRODUCT_FIELDS,
+    PRODUCT_FIELDS_PATTERN,
+    parse_fields,
+    product_fields_model,
+)
+from app.search_cache import (
+    RankedIds,
+    bump_catalog_version,
+    ranked_search_ids,
+    search_cache_key,
+)
 from app.models.categories import Category
 from app.models.products import Product
 from app.models.reviews import Review as ReviewModel
 from app.models.users import User as UserModel
-from app.schemas import ProductSheme, ProductCreate, Review, ProductList
+from app.pagination import decode_cursor, encode_cursor, keyset_filter, keyset_order
+from app.totals import TOTAL_MODES_PATTERN, count_total, invalidate_totals
+from app.suggest import SUGGEST_MIN_LENGTH, invalidate_suggestions, suggest_products
+from app.ratings import GRADES
+from app.response_cache import (
+    CATEGORY_DEPENDENT_TAG,
+    PRODUCT_LISTS_TAG,
+    category_products_tag,
+    product_tag,
+    response_cache,
+)
+from app.schemas import (
+    BulkImportError,
+    BulkImportResult,
+    ProductSheme,
+    ProductCreate,
+    ProductSuggestion,
+    ProductBatch,
+    ProductBatchRequest,
+    Review,
+    ProductList,
+    ReviewSummary,
+)
 
 router = APIRouter(
     prefix="/products",
@@ -19,22 +63,51 @@ router = APIRouter(
 )
 
 
-@router.get(path="/", response_model=ProductList, status_code=status.HTTP_200_OK)
-async def get_all_products(
-    db: Annotated[AsyncSession, Depends(get_async_db)],
-    page: int = Query(1, ge=1),
-    page_size: int = Query(20, gt=0, le=1),
-    category_id: int | None = Query(None, description="ID категории"),
-    min_price: float | None = Query(None, description="Минимальная цена товара"),
-    max_price: float | None = Query(None, description="Максимальная цена товара"),
-    search: str | None = Query(
-        None, min_length=1, description="Поиск по названию товара"
-    ),
-    in_stock: bool | None = Query(
-        None, description="true - товар есть в наличии, иначе false"
-    ),
-    seller_id: int | None = Query(None, description="ID продавца для фильтрации"),
-):
+# Поддерживаемые сортировки: столбец ключа, направление, разбор ключа из курсора.
+# Для каждой есть составной индекс (ключ, id) в модели Product.
+PRODUCT_SORTS = {
+    "id": (None, False, None),
+    "price": (Product.price, False, float),
+    "rating": (Product.rating, True, Decimal),
+    "newest": (Product.created_at, True, datetime.fromisoformat),
+}
+
+# Больше id в GET /products/batch не помещается в разумный URL
+BATCH_GET_MAX_IDS = 100
+
+
+async def _invalidate_catalog_caches(
+    db: AsyncSession, product_id: int | None = None, category_ids: tuple = ()
+) -> None:
+    """
+    Сбрасывает производные от каталога данные после записи товаров:
+    страницы товара, общих списков и списков затронутых категорий с предками.
+    """
+    tree = await category_tree.get(db)
+    tags = {PRODUCT_LISTS_TAG}
+    if product_id is not None:
+        tags.add(product_tag(product_id))
+    for category_id in category_ids:
+        tags.update(map(category_products_tag, tree.ancestor_ids(category_id)))
+    await response_cache.invalidate(*tags)
+    invalidate_totals(Product.__tablename__)
+    invalidate_suggestions()
+    bump_catalog_version()
+    category_tree.invalidate()
+
+
+async def _build_product_filters(
+    db: AsyncSession,
+    category_id: int | None,
+    min_price: float | None,
+    max_price: float | None,
+    search: str | None,
+    in_stock: bool | None,
+    seller_id: int | None,
+) -> tuple[list, Any]:
+    """
+    Условия WHERE для списка товаров и, при поиске, выражение ts_rank.
+    """
     if min_price and max_price and min_price > max_price:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -43,7 +116,8 @@ async def get_all_products(
 
     filters = [Product.is_active == True]
     if category_id is not None:
-        filters.append(Product.category_id == category_id)
+        tree = await category_tree.get(db)
+        filters.append(Product.category_id.in_(tree.subtree_ids(category_id)))
     if min_price is not None:
         filters.append(Product.price >= min_price)
     if max_price is not None:
@@ -51,9 +125,7 @@ async def get_all_products(
     if in_stock is not None:
         filters.append(Product.stock > 0 if in_stock else Product.stock == 0)
     if seller_id is not None:
-        filters.append(Product.seller == seller_id)
-
-    total_stmt = select(func.count()).select_from(Product).where(*filters)
+        filters.append(Product.seller_id == seller_id)
 
     rank_col = None
     if search is not None:
@@ -61,33 +133,319 @@ async def get_all_products(
         if search_value:
             ts_query = func.websearch_to_tsquery("english", search_value)
             filters.append(Product.tsv.op("@@")(ts_query))
-            rank_col = func.ts_rank(Product.tsv, ts_query).label("rank")
-            total_stmt = select(func.count()).select_from(Product).where(*filters)
-
-    total = await db.scalar(total_stmt) or 0
-
-    if rank_col is not None:
-        products_stmt = (
-            select(Product, rank_col)
-            .where(*filters)
-            .order_by(desc(rank_col), Product.id)
-            .offset((page - 1) * page_size)
-            .limit(page_size)
-        )
-        result = await db.execute(products_stmt)
-        row = result.all()
-        items = [row[0] for row in row]
+            rank_col = func.ts_rank(Product.tsv, ts_query)
+    return filters, rank_col
+
+
+def _select_products(fields: tuple[str, ...]):
+    """
+    SELECT только столбцов товара из fields, без ORM-объектов. id
+    выбирается всегда: по нему строится курсор и порядок страницы.
+    """
+    names = dict.fromkeys(("id", *fields))
+    return select(*(getattr(Product, name) for name in names))
+
+
+async def _products_page(
+    db: AsyncSession,
+    filters: list,
+    rank_col,
+    sort: str | None,
+    page: int,
+    page_size: int,
+    cursor: str | None,
+    fields: tuple[str, ...],
+) -> tuple[list, str | None]:
+    """
+    Страница списка товаров из БД: keyset по курсору или OFFSET по page.
+    """
+    if sort is None and rank_col is not None:
+        sort_name, key_col, descending, parse_key = "rank", rank_col, True, float
     else:
-        products_stmt = (
-            select(Product)
-            .where(*filters)
-            .order_by(Product.id)
-            .offset((page - 1) * page_size)
-            .limit(page_size)
+        sort_name = sort or "id"
+        key_col, descending, parse_key = PRODUCT_SORTS[sort_name]
+
+    products_stmt = _select_products(fields)
+    if key_col is not None:
+        products_stmt = products_stmt.add_columns(key_col.label("sort_key"))
+    products_stmt = products_stmt.where(*filters).order_by(
+        *keyset_order(key_col, Product.id, descending)
+    )
+    if cursor is not None:
+        key, last_id = decode_cursor(cursor, sort_name, parse_key)
+        products_stmt = products_stmt.where(
+            keyset_filter(key_col, Product.id, descending, key, last_id)
         )
-        items = (await db.scalars(products_stmt)).all()
+    else:
+        products_stmt = products_stmt.offset((page - 1) * page_size)
+    # Лишняя строка показывает, есть ли следующая страница
+    rows = (await db.execute(products_stmt.limit(page_size + 1))).all()
 
-    return {"items": items, "total": total, "page": page, "page_size": page_size}
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            sort_name, last.sort_key if key_col is not None else None, last.id
+        )
+    return rows, next_cursor
+
+
+async def _ranked_page(
+    db: AsyncSession,
+    ranked: RankedIds,
+    page: int,
+    page_size: int,
+    cursor: str | None,
+    fields: tuple[str, ...],
+) -> tuple[list, str | None] | None:
+    """
+    Страница выдачи по релевантности из закэшированного списка id: один
+    запрос WHERE id IN (...) без ts_rank. None - страница выходит за
+    сохранённую часть списка и читается из БД.
+    """
+    if cursor is not None:
+        rank, last_id = decode_cursor(cursor, "rank", float)
+        start = ranked.position_after(rank, last_id)
+    else:
+        start = (page - 1) * page_size
+    end = start + page_size
+    if end >= len(ranked) and not ranked.complete:
+        return None
+
+    page_ids = ranked.ids[start:end]
+    products = {}
+    if page_ids:
+        rows = await db.execute(
+            _select_products(fields).where(Product.id.in_(page_ids))
+        )
+        products = {row.id: row for row in rows}
+    next_cursor = None
+    if end < len(ranked):
+        next_cursor = encode_cursor("rank", ranked.ranks[end - 1], page_ids[-1])
+    return [products[id_] for id_ in page_ids if id_ in products], next_cursor
+
+
+@router.get(path="/", response_model=ProductList, status_code=status.HTTP_200_OK)
+async def get_all_products(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, gt=0, le=100),
+    category_id: int | None = Query(None, description="ID категории"),
+    min_price: float | None = Query(None, description="Минимальная цена товара"),
+    max_price: float | None = Query(None, description="Максимальная цена товара"),
+    search: str | None = Query(
+        None, min_length=1, description="Поиск по названию товара"
+    ),
+    in_stock: bool | None = Query(
+        None, description="true - товар есть в наличии, иначе false"
+    ),
+    seller_id: int | None = Query(None, description="ID продавца для фильтрации"),
+    sort: str | None = Query(
+        None,
+        pattern="^(id|price|rating|newest)$",
+        description="Сортировка: id, price, rating, newest. "
+        "По умолчанию - релевантность при поиске, иначе id",
+    ),
+    cursor: str | None = Query(
+        None, description="Курсор следующей страницы (next_cursor из ответа)"
+    ),
+    total_mode: str = Query(
+        "exact",
+        pattern=TOTAL_MODES_PATTERN,
+        description="Подсчёт total: exact, cached или estimate",
+    ),
+    facets: str | None = Query(
+        None,
+        pattern=FACETS_PATTERN,
+        description="Счётчики для фильтров через запятую: category, price, "
+        "stock, seller. Total тогда считается вместе с ними",
+    ),
+    price_buckets: int = Query(
+        10, ge=1, le=50, description="Число интервалов гистограммы цен"
+    ),
+    fields: str | None = Query(
+        None,
+        pattern=PRODUCT_FIELDS_PATTERN,
+        description="Поля товара через запятую (как в ProductSheme), "
+        "например id,name,price,stock. Остальные не читаются из БД и не "
+        "попадают в ответ",
+    ),
+):
+    # Кэшируем только анонимные запросы
+    cacheable = "authorization" not in request.headers
+    if cacheable:
+        cached = await response_cache.get(request)
+        if cached is not None:
+            return cached
+
+    filters, rank_col = await _build_product_filters(
+        db, category_id, min_price, max_price, search, in_stock, seller_id
+    )
+
+    filter_params = {
+        "category_id": category_id,
+        "min_price": min_price,
+        "max_price": max_price,
+        "in_stock": in_stock,
+        "seller_id": seller_id,
+    }
+    # Выдача по релевантности берётся из кэша ранжированных id
+    ranked = None
+    if sort is None and rank_col is not None:
+        ranked = await ranked_search_ids(
+            db, filters, rank_col, search_cache_key(search, filter_params)
+        )
+
+    facet_names = parse_facets(facets)
+    facet_counts = None
+    if facet_names:
+        # Общий итог приходит из того же агрегата, отдельный COUNT не нужен
+        total, facet_counts = await compute_facets(
+            db, filters, facet_names, price_buckets
+        )
+        total_mode = "exact"
+    elif ranked is not None and ranked.complete:
+        total, total_mode = len(ranked), "exact"
+    else:
+        total, total_mode = await count_total(
+            db, Product, filters, {**filter_params, "search": search}, total_mode
+        )
+
+    # Без fields отдаются поля ProductCreate: их и читаем, без ORM-объектов
+    field_names = parse_fields(fields)
+    columns = field_names or tuple(ProductCreate.model_fields)
+    page_from_cache = None
+    if ranked is not None:
+        page_from_cache = await _ranked_page(
+            db, ranked, page, page_size, cursor, columns
+        )
+    if page_from_cache is not None:
+        items, next_cursor = page_from_cache
+    else:
+        items, next_cursor = await _products_page(
+            db, filters, rank_col, sort, page, page_size, cursor, columns
+        )
+
+    product_list = {
+        "items": rows_to_dicts(items, columns),
+        "total": total,
+        "total_mode": total_mode,
+        "page": page,
+        "page_size": page_size,
+        "next_cursor": next_cursor,
+        "facets": facet_counts,
+    }
+    if cacheable:
+        return await response_cache.store_body(
+            request, dump_json(product_list), tags=[PRODUCT_LISTS_TAG]
+        )
+    return json_response(product_list)
+
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+async def export_products(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    format: str = Query("ndjson", pattern=EXPORT_FORMATS_PATTERN),
+    category_id: int | None = Query(None, description="ID категории"),
+    min_price: float | None = Query(None, description="Минимальная цена товара"),
+    max_price: float | None = Query(None, description="Максимальная цена товара"),
+    search: str | None = Query(
+        None, min_length=1, description="Поиск по названию товара"
+    ),
+    in_stock: bool | None = Query(
+        None, description="true - товар есть в наличии, иначе false"
+    ),
+    seller_id: int | None = Query(None, description="ID продавца для фильтрации"),
+):
+    """
+    Выгрузка всего каталога (с теми же фильтрами, что и у списка)
+    потоком NDJSON или CSV.
+    """
+    filters, _ = await _build_product_filters(
+        db, category_id, min_price, max_price, search, in_stock, seller_id
+    )
+    stmt = (
+        select(*(getattr(Product, name) for name in ProductSheme.model_fields))
+        .where(*filters)
+        .order_by(Product.id)
+    )
+    return export_response(read_session_maker(request), stmt, format, "products")
+
+
+@router.get(
+    "/suggest",
+    response_model=List[ProductSuggestion],
+    status_code=status.HTTP_200_OK,
+)
+async def suggest(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    q: str = Query(
+        min_length=SUGGEST_MIN_LENGTH,
+        max_length=100,
+        description="Начало названия товара или его фрагмент",
+    ),
+    limit: int = Query(SUGGEST_LIMIT, ge=1, le=20),
+):
+    """
+    Подсказки названий активных товаров для автодополнения: сначала
+    совпадения по префиксу, затем (если на сервере есть pg_trgm) похожие
+    названия. Без подсчёта total и ранжирования полнотекстового поиска.
+    """
+    return await suggest_products(db, q, limit)
+
+
+async def _get_products_batch(db: AsyncSession, ids: list[int]) -> dict:
+    """
+    Активные товары по списку id одним запросом, в порядке запроса
+    (повторы убираются), и id, которых нет или которые неактивны.
+    """
+    ids = list(dict.fromkeys(ids))
+    result = await db.scalars(
+        select(Product).where(Product.id.in_(ids), Product.is_active == True)
+    )
+    found = {product.id: product for product in result}
+    return {
+        "items": [found[id_] for id_ in ids if id_ in found],
+        "missing": [id_ for id_ in ids if id_ not in found],
+    }
+
+
+@router.get("/batch", response_model=ProductBatch, status_code=status.HTTP_200_OK)
+async def get_products_batch(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    ids: str = Query(
+        pattern=rf"^\d+(,\d+){{0,{BATCH_GET_MAX_IDS - 1}}}$",
+        description=f"ID товаров через запятую, не больше {BATCH_GET_MAX_IDS}",
+    ),
+):
+    """
+    Несколько товаров за один запрос вместо GET /products/{id} на каждый
+    (корзина, избранное, заказ). Длинные списки - через POST /products/batch.
+    """
+    cached = await response_cache.get(request)
+    if cached is not None:
+        return cached
+    batch = await _get_products_batch(db, [int(id_) for id_ in ids.split(",")])
+    tags = [product_tag(product.id) for product in batch["items"]]
+    if batch["missing"]:
+        # Отсутствующий товар может появиться при создании
+        tags.append(PRODUCT_LISTS_TAG)
+    return await response_cache.store(request, ProductBatch, batch, tags=tags)
+
+
+@router.post("/batch", response_model=ProductBatch, status_code=status.HTTP_200_OK)
+async def post_products_batch(
+    payload: ProductBatchRequest,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+):
+    """
+    То же, что GET /products/batch, для списков, которые не помещаются в URL.
+    """
+    return await _get_products_batch(db, payload.ids)
 
 
 @router.post("/", response_model=ProductSheme, status_code=status.HTTP_201_CREATED)
@@ -106,31 +464,161 @@ async def create_product(
     db_product = Product(**product.model_dump(), seller_id=current_user.id)
     db.add(db_product)
     await db.commit()
+    await _invalidate_catalog_caches(db, category_ids=(db_product.category_id,))
     await db.refresh(db_product)
     return db_product
 
 
+async def _insert_products_chunk(
+    db: AsyncSession,
+    chunk: list[tuple[int, ProductCreate]],
+    seller_id: int,
+    report: BulkImportResult,
+    touched_categories: set[int],
+) -> None:
+    category_ids = {product.category_id for _, product in chunk}
+    existing = set(
+        await db.scalars(select(Category.id).where(Category.id.in_(category_ids)))
+    )
+    rows = []
+    for row_no, product in chunk:
+        if product.category_id not in existing:
+            _report_row_error(
+                report, row_no, [f"Category {product.category_id} does not exist"]
+            )
+            continue
+        row = {**product.model_dump(), "seller_id": seller_id}
+        # В схеме описание необязательно, а столбец NOT NULL: одна такая
+        # строка не должна отклонять всю пачку
+        if row["description"] is None:
+            row["description"] = ""
+        rows.append((row_no, row))
+    if not rows:
+        return
+    try:
+        await db.execute(insert(Product), [row for _, row in rows])
+        await db.commit()
+    except DBAPIError as e:
+        # Пачка вставляется целиком или не вставляется совсем
+        await db.rollback()
+        for row_no, _ in rows:
+            _report_row_error(report, row_no, [f"Batch rejected: {e.orig}"])
+        return
+    report.inserted += len(rows)
+    touched_categories.update(row["category_id"] for _, row in rows)
+
+
+def _report_row_error(report: BulkImportResult, row_no: int, errors: list[str]):
+    report.failed += 1
+    if len(report.errors) < BULK_IMPORT_MAX_ERRORS:
+        report.errors.append(BulkImportError(row=row_no, errors=errors))
+    else:
+        report.errors_truncated = True
+
+
+@router.post(
+    "/bulk",
+    response_model=BulkImportResult,
+    status_code=status.HTTP_200_OK,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/x-ndjson": {"schema": {"type": "string"}},
+                "text/csv": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def bulk_import_products(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    current_user: Annotated[UserModel, Depends(get_current_seller)],
+):
+    """
+    Массовая загрузка товаров потоком NDJSON или CSV (по заголовку
+    Content-Type). Строки проверяются по ProductCreate и вставляются
+    пачками по BULK_IMPORT_CHUNK_SIZE, каждая пачка - отдельная транзакция.
+    """
+    report = BulkImportResult(inserted=0, failed=0)
+    touched_categories: set[int] = set()
+    chunk: list[tuple[int, ProductCreate]] = []
+    async for row_no, row in iter_rows(request):
+        if isinstance(row, RowError):
+            _report_row_error(report, row_no, [str(row)])
+            continue
+        try:
+            chunk.append((row_no, ProductCreate.model_validate(row)))
+        except ValidationError as e:
+            _report_row_error(
+                report,
+                row_no,
+                [
+                    f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                    for error in e.errors()
+                ],
+            )
+            continue
+        if len(chunk) >= BULK_IMPORT_CHUNK_SIZE:
+            await _insert_products_chunk(
+                db, chunk, current_user.id, report, touched_categories
+            )
+            chunk = []
+    if chunk:
+        await _insert_products_chunk(
+            db, chunk, current_user.id, report, touched_categories
+        )
+    if report.inserted:
+        await _invalidate_catalog_caches(db, category_ids=tuple(touched_categories))
+    return report
+
+
 @router.get(
     path="/categories/{category_id}",
     response_model=List[ProductSheme],
     status_code=status.HTTP_200_OK,
 )
 async def get_products_category(
-    category_id: int, db: Annotated[AsyncSession, Depends(get_async_db)]
+    category_id: int,
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    fields: str | None = Query(
+        None,
+        pattern=PRODUCT_FIELDS_PATTERN,
+        description="Поля товара через запятую, например id,name,price,stock",
+    ),
 ):
-    stmt = select(Product).where(
-        and_(Product.category_id == category_id, Product.is_active)
+    cached = await response_cache.get(request)
+    if cached is not None:
+        return cached
+    tree = await category_tree.get(db)
+    field_names = parse_fields(fields)
+    stmt = _select_products(field_names or PRODUCT_FIELDS).where(
+        and_(Product.category_id.in_(tree.subtree_ids(category_id)), Product.is_active)
+    )
+    result = await db.execute(stmt)
+    response_model = List[ProductSheme]
+    if field_names is not None:
+        response_model = List[product_fields_model(field_names)]
+    return await response_cache.store(
+        request,
+        response_model,
+        result.all(),
+        tags=[category_products_tag(category_id), CATEGORY_DEPENDENT_TAG],
     )
-    result = await db.scalars(stmt)
-    return result.all()
 
 
 @router.get(
     path="/{product_id}", response_model=ProductSheme, status_code=status.HTTP_200_OK
 )
 async def get_product(
-    product_id: int, db: Annotated[AsyncSession, Depends(get_async_db)]
+    product_id: int,
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
 ):
+    cached = await response_cache.get(request)
+    if cached is not None:
+        return cached
     stmt = select(Product).where(and_(product_id == Product.id, Product.is_active))
     response = await db.scalars(stmt)
     result = response.first()
@@ -139,7 +627,9 @@ async def get_product(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Product {product_id} does not exist",
         )
-    return result
+    return await response_cache.store(
+        request, ProductSheme, result, tags=[product_tag(product_id)]
+    )
 
 
 @router.put(
@@ -171,12 +661,16 @@ async def update_product(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Category {product.category_id} does not exist",
         )
+    old_category_id = db_product.category_id
     await db.execute(
         update(Product).where(product_id == Product.id).values(**product.model_dump())
     )
     await db.commit()
-    await db.refresh(result)
-    return result
+    await _invalidate_catalog_caches(
+        db, product_id, category_ids=(old_category_id, product.category_id)
+    )
+    await db.refresh(db_product)
+    return db_product
 
 
 @router.delete(path="/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -195,6 +689,9 @@ async def delete_product(
         )
     result.is_active = False
     await db.commit()
+    await _invalidate_catalog_caches(
+        db, product_id, category_ids=(result.category_id,)
+    )
 
 
 @router.get(
@@ -203,7 +700,7 @@ async def delete_product(
     status_code=status.HTTP_200_OK,
 )
 async def get_reviews(
-    product_id: int, db: Annotated[AsyncSession, Depends(get_async_db)]
+    product_id: int, db: Annotated[AsyncSession, Depends(get_read_db)]
 ):
     response = await db.scalars(
         select(ReviewModel)
@@ -223,3 +720,32 @@ async def get_reviews(
         )
     reviews = response.all()
     return reviews
+
+
+@router.get(
+    path="/{product_id}/reviews/summary",
+    response_model=ReviewSummary,
+    status_code=status.HTTP_200_OK,
+)
+async def get_reviews_summary(
+    product_id: int, db: Annotated[AsyncSession, Depends(get_read_db)]
+):
+    grade_columns = [getattr(Product, f"grade_{grade}_count") for grade in GRADES]
+    result = await db.execute(
+        select(Product.rating, Product.rating_count, *grade_columns).where(
+            and_(product_id == Product.id, Product.is_active)
+        )
+    )
+    row = result.first()
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product {product_id} does not exist",
+        )
+    rating, reviews_count, *grade_counts = row
+    return ReviewSummary(
+        product_id=product_id,
+        rating=rating or 0,
+        reviews_count=reviews_count,
+        histogram=dict(zip(GRADES, grade_counts)),
+    )
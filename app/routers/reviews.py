@@ -1,16 +1,19 @@
 from fastapi import APIRouter, Depends, status, HTTPException
 from typing import List, Annotated, Dict
 
-from sqlalchemy import select, func
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
 from app.schemas import Review, ReviewCreate
-from app.db_depends import get_async_db
+from app.db_depends import get_async_db, get_read_db
+from app.fast_json import json_response, rows_to_dicts
 from app.models.reviews import Review as ReviewModel
 from app.models.users import User as UserModel
 from app.models.products import Product as ProductModel
 from app.auth import get_current_buyer, get_current_admin
+from app.ratings import apply_review_grade
+from app.response_cache import PRODUCT_LISTS_TAG, response_cache
 
 router = APIRouter(
     prefix="/reviews",
@@ -18,14 +21,18 @@ router = APIRouter(
 )
 
 
+REVIEW_FIELDS = tuple(Review.model_fields)
+
+
 @router.get(path="/", response_model=List[Review], status_code=status.HTTP_200_OK)
 async def get_reviews(
-    db: Annotated[AsyncSession, Depends(get_async_db)],
-) -> List[ReviewModel]:
-    stmt = select(ReviewModel).where(ReviewModel.is_active)
-    response = await db.scalars(stmt)
-    db_reviews = response.all()
-    return db_reviews
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+):
+    stmt = select(*(getattr(ReviewModel, name) for name in REVIEW_FIELDS)).where(
+        ReviewModel.is_active
+    )
+    rows = (await db.execute(stmt)).all()
+    return json_response(rows_to_dicts(rows, REVIEW_FIELDS))
 
 
 @router.post(path="/", response_model=Review, status_code=status.HTTP_201_CREATED)
@@ -36,54 +43,51 @@ async def create_review(
 ) -> Review:
     user_id = current_user.id
 
-    stmt = select(Product).where(review.product_id == Product.id, Product.is_active)
-
-    db_response = await db.scalars(stmt)
-    db_product = db_response.first()
-    if not db_product:
+    stmt = select(ProductModel.id).where(
+        review.product_id == ProductModel.id, ProductModel.is_active
+    )
+    if await db.scalar(stmt) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Product does not exist"
         )
 
     db_review = ReviewModel(**review.model_dump(), user_id=user_id)
     db.add(db_review)
+    await db.flush()
+    await apply_review_grade(db, product_id=review.product_id, grade=review.grade)
     await db.commit()
-    await db.refresh(db_review)
-    await update_product_rating(db, product_id=db_product.id)
+    # Рейтинг влияет на порядок списков товаров с sort=rating
+    await response_cache.invalidate(PRODUCT_LISTS_TAG)
     return db_review
 
 
-async def update_product_rating(db: AsyncSession, product_id: int) -> None:
-    result = await db.execute(
-        select(func.avg(ReviewModel.grade)).where(
-            product_id == ReviewModel.product_id, ReviewModel.is_active
+@router.delete(
+    path="/{review_id}",
+    response_model=Dict[str, str],
+    status_code=status.HTTP_200_OK,
+)
+async def delete_review(
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    review_id: int,
+    auth: Annotated[UserModel, Depends(get_current_admin)],
+) -> Dict:
+    # Условный UPDATE: из двух одновременных удалений строку вернёт только
+    # одно, и оценка вычитается из счётчиков товара ровно один раз
+    stmt = (
+        update(ReviewModel)
+        .where(ReviewModel.id == review_id, ReviewModel.is_active)
+        .values(is_active=False)
+        .returning(ReviewModel.product_id, ReviewModel.grade)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = (await db.execute(stmt)).first()
+    if deleted is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Review does not exist"
         )
+    await apply_review_grade(
+        db, product_id=deleted.product_id, grade=deleted.grade, sign=-1
     )
-    avg_rating = result.scalar() or 0.0
-    product = await db.get(Product, product_id)
-    product.rating = avg_rating
     await db.commit()
-
-
-# @router.delete(
-#     path='/{review_id}',
-#     response_model=Dict[str, str],
-#     status_code=status.HTTP_200_OK
-# )
-# async def delete_review(
-#         db: Annotated[AsyncSession, Depends(get_async_db)],
-#         review_id: int,
-#         auth: Annotated[UserModel, Depends(get_current_admin)]
-# ) -> Dict:
-#     stmt = select(ReviewModel).where(review_id == ReviewModel.id)
-#     db_response = await db.scalars(stmt)
-#     db_review = db_response.first()
-#     if not db_review:
-#         raise HTTPException(
-#             status_code=status.HTTP_404_NOT_FOUND,
-#             detail="Review does not exist"
-#         )
-#     db_review.is_active = False
-#     await db.commit()
-#     await db.refresh(db_review)
-#     return {'message': 'Review deleted'}
+    await response_cache.invalidate(PRODUCT_LISTS_TAG)
+    return {"message": "Review deleted"}
@@ -0,0 +1,91 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import get_current_seller
+from app.db_depends import get_read_db
+from app.models.seller_stats import SellerDailyStats
+from app.models.users import User as UserModel
+from app.schemas import SellerStats
+
+router = APIRouter(
+    prefix="/sellers",
+    tags=["sellers"],
+)
+
+DEFAULT_RANGE_DAYS = 30
+MAX_RANGE_DAYS = 366
+
+
+@router.get("/me/stats", response_model=SellerStats)
+async def get_my_stats(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[UserModel, Depends(get_current_seller)],
+    date_from: date | None = Query(
+        None, description="Начало периода (UTC), по умолчанию 30 дней назад"
+    ),
+    date_to: date | None = Query(
+        None, description="Конец периода (UTC), по умолчанию сегодня"
+    ),
+    group_by: str = Query("day", pattern="^(day|product)$"),
+    product_id: int | None = Query(None, description="Только один товар"),
+):
+    """
+    Выручка и продажи продавца за период по дням или по товарам.
+
+    Читается только дневная статистика (продавец x товар x день), а не
+    заказы: стоимость запроса зависит от длины периода и числа товаров,
+    но не от числа заказов.
+    """
+    if date_to is None:
+        date_to = datetime.now(timezone.utc).date()
+    if date_from is None:
+        date_from = date_to - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_from can't be later than date_to",
+        )
+    if (date_to - date_from).days >= MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range can't be longer than {MAX_RANGE_DAYS} days",
+        )
+
+    key = (
+        SellerDailyStats.day if group_by == "day" else SellerDailyStats.product_id
+    )
+    stmt = (
+        select(
+            key,
+            func.sum(SellerDailyStats.orders_count).label("orders_count"),
+            func.sum(SellerDailyStats.units_sold).label("units_sold"),
+            func.sum(SellerDailyStats.revenue).label("revenue"),
+        )
+        .where(
+            SellerDailyStats.seller_id == current_user.id,
+            SellerDailyStats.day.between(date_from, date_to),
+        )
+        .group_by(key)
+        .order_by(key)
+    )
+    if product_id is not None:
+        stmt = stmt.where(SellerDailyStats.product_id == product_id)
+    # Строки с нулями остаются после отмены всех заказов дня
+    stmt = stmt.having(func.sum(SellerDailyStats.units_sold) != 0)
+    rows = [row._mapping for row in await db.execute(stmt)]
+
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "group_by": group_by,
+        "totals": {
+            "orders_count": sum(row["orders_count"] for row in rows),
+            "units_sold": sum(row["units_sold"] for row in rows),
+            "revenue": sum((row["revenue"] for row in rows), 0),
+        },
+        "rows": rows,
+    }
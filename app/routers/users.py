@@ -9,8 +9,8 @@ from app.models.users import User as UserModel
 from app.schemas import UserCreate, User as UserSchema, Review as ReviewSchema, Review
 from app.db_depends import get_async_db
 from app.auth import (
-    hash_password,
-    verify_password,
+    hash_password_async,
+    verify_password_async,
     create_access_token,
     create_refresh_token,
     JWT_SECRET_KEY,
@@ -33,10 +33,12 @@ async def create_user(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered"
         )
+    # Соединение не держим, пока хеш ждёт пула паролей
+    await db.close()
 
     db_user = UserModel(
         email=user.email,
-        hashed_password=hash_password(user.password),
+        hashed_password=await hash_password_async(user.password),
         role=user.role,
     )
 
@@ -55,8 +57,13 @@ async def login(
     )
 
     user = result.first()
+    # bcrypt может ждать очереди пула паролей секунды - соединение с БД
+    # на это время возвращаем в пул, иначе вход выбирает его у каталога
+    await db.close()
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(
+        form_data.password, user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
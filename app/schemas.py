@@ -1,5 +1,5 @@
-from datetime import datetime
-from typing import Optional, List
+from datetime import date, datetime
+from typing import Optional, List, Dict
 
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from pydantic.types import Decimal
@@ -23,6 +23,25 @@ class Category(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class CategoryTreeNode(BaseModel):
+    """
+    Узел дерева категорий с количеством активных товаров.
+    """
+
+    id: int = Field(description="Уникальный идентификатор категории")
+    name: str = Field(description="Название категории")
+    parent_id: Optional[int] = Field(None, description="ID родительской категории")
+    product_count: int = Field(ge=0, description="Активных товаров в категории")
+    subtree_product_count: int = Field(
+        ge=0, description="Активных товаров в категории и всех подкатегориях"
+    )
+    children: List["CategoryTreeNode"] = Field(
+        default_factory=list, description="Подкатегории"
+    )
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class ProductCreate(BaseModel):
     name: str = Field(
         min_length=3, max_length=100, description="Название товара (3-100 символов)"
@@ -56,6 +75,46 @@ class ProductSheme(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ProductBatchRequest(BaseModel):
+    ids: List[int] = Field(
+        min_length=1,
+        max_length=1000,
+        description="ID товаров; порядок ответа совпадает с порядком запроса",
+    )
+
+
+class ProductBatch(BaseModel):
+    items: List[ProductSheme] = Field(description="Найденные товары в порядке запроса")
+    missing: List[int] = Field(
+        default_factory=list, description="ID, которых нет или которые неактивны"
+    )
+
+
+class ProductSuggestion(BaseModel):
+    id: int = Field(description="ID товара")
+    name: str = Field(description="Название товара")
+
+
+class BulkImportError(BaseModel):
+    row: int = Field(description="Номер строки файла")
+    errors: List[str] = Field(description="Что не так со строкой")
+
+
+class BulkImportResult(BaseModel):
+    """
+    Отчёт о массовом импорте товаров.
+    """
+
+    inserted: int = Field(ge=0, description="Добавлено товаров")
+    failed: int = Field(ge=0, description="Отклонено строк")
+    errors: List[BulkImportError] = Field(
+        default_factory=list, description="Ошибки по строкам"
+    )
+    errors_truncated: bool = Field(
+        False, description="В отчёт попали не все ошибки"
+    )
+
+
 class UserCreate(BaseModel):
     email: str = Field(description="Email пользователя")
     password: str = Field(min_length=8, description="Пароль (минимум 8 символов")
@@ -93,11 +152,65 @@ class Review(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ReviewSummary(BaseModel):
+    """
+    Сводка по отзывам товара из денормализованных счётчиков.
+    """
+
+    product_id: int = Field(description="ID товара")
+    rating: float = Field(ge=0, le=5, description="Средняя оценка")
+    reviews_count: int = Field(ge=0, description="Количество активных отзывов")
+    histogram: Dict[int, int] = Field(
+        description="Количество отзывов по оценкам от 1 до 5"
+    )
+
+
+class FacetCount(BaseModel):
+    value: int = Field(description="ID категории или продавца")
+    count: int = Field(ge=0, description="Количество подходящих товаров")
+
+
+class PriceBucket(BaseModel):
+    min: float = Field(description="Нижняя граница интервала цен")
+    max: float = Field(description="Верхняя граница интервала цен")
+    count: int = Field(ge=0, description="Количество подходящих товаров")
+
+
+class StockFacet(BaseModel):
+    in_stock: int = Field(ge=0, description="Товаров в наличии")
+    out_of_stock: int = Field(ge=0, description="Товаров нет в наличии")
+
+
+class ProductFacets(BaseModel):
+    """
+    Счётчики для фильтров витрины по всем товарам, подходящим под
+    текущие фильтры и поиск (а не только по текущей странице).
+    """
+
+    categories: Optional[List[FacetCount]] = Field(
+        None, description="По категориям товара, без учёта подкатегорий"
+    )
+    price: Optional[List[PriceBucket]] = Field(
+        None, description="Гистограмма цен, интервалы без товаров опущены"
+    )
+    stock: Optional[StockFacet] = Field(None, description="По наличию")
+    sellers: Optional[List[FacetCount]] = Field(None, description="По продавцам")
+
+
 class ProductList(BaseModel):
     items: List[ProductCreate] = Field(description="Товары для текущей страницы")
     total: int = Field(ge=0, description="Общее количество товаров")
+    total_mode: str = Field(
+        "exact", description="Чем получен total: exact, cached или estimate"
+    )
     page: int = Field(ge=1, description="Номер текущей страницы")
     page_size: int = Field(ge=1, description="Количество элементов на странице")
+    next_cursor: Optional[str] = Field(
+        None, description="Курсор следующей страницы, если она есть"
+    )
+    facets: Optional[ProductFacets] = Field(
+        None, description="Счётчики фасетов, если они запрошены параметром facets"
+    )
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -108,22 +221,80 @@ class Order(BaseModel):
     total_price: float
     status: str
     is_active: bool = True
+    paid_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True, extra="allow")
 
 
+class OrderStatusUpdate(BaseModel):
+    status: str = Field(
+        pattern="^(paid|canceled)$",
+        description="Новый статус: paid - из in process, "
+        "canceled - из in process или paid",
+    )
+
+
+class OrderLine(BaseModel):
+    product_id: int = Field(description="ID товара")
+    quantity: int = Field(ge=1, description="Количество товара")
+    unit_price: Decimal = Field(description="Цена за единицу на момент заказа")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class OrderWithLines(Order):
+    lines: List[OrderLine] = Field(default_factory=list, description="Позиции заказа")
+
+
+class OrderHistory(BaseModel):
+    items: List[OrderWithLines] = Field(description="Заказы, новые первыми")
+    page_size: int = Field(ge=1, description="Количество элементов на странице")
+    next_cursor: Optional[str] = Field(
+        None, description="Курсор следующей страницы, null - страниц больше нет"
+    )
+
+
 class OrderList(BaseModel):
     items: List[Order] = Field(description="Список заказов")
     total: int = Field(ge=0, description="Общее количество заказов")
+    total_mode: str = Field(
+        "exact", description="Чем получен total: exact, cached или estimate"
+    )
     page: int = Field(ge=1, description="Номер страницы")
     page_size: int = Field(ge=1, description="Количество элементов на странице")
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class SellerStatsTotals(BaseModel):
+    orders_count: int = Field(
+        description="Заказы с товаром; по дням и в итогах - сумма по товарам, "
+        "заказ с двумя товарами продавца учитывается дважды"
+    )
+    units_sold: int = Field(description="Продано единиц товара")
+    revenue: Decimal = Field(description="Выручка по ценам на момент заказа")
+
+
+class SellerStatsRow(SellerStatsTotals):
+    day: Optional[date] = Field(None, description="День (UTC) при group_by=day")
+    product_id: Optional[int] = Field(
+        None, description="ID товара при group_by=product"
+    )
+
+
+class SellerStats(BaseModel):
+    date_from: date = Field(description="Начало периода (UTC), включительно")
+    date_to: date = Field(description="Конец периода (UTC), включительно")
+    group_by: str = Field(description="Группировка строк: day или product")
+    totals: SellerStatsTotals = Field(description="Итоги за период")
+    rows: List[SellerStatsRow] = Field(
+        default_factory=list, description="Строки с продажами, дни без продаж опущены"
+    )
+
+
 class CartItemBase(BaseModel):
     product_id: int = Field(description="ID товара")
-    quantity: int = Field(description="Количество товара")
+    quantity: int = Field(ge=1, description="Количество товара")
 
 
 class CartItemCreate(CartItemBase):
@@ -134,6 +305,24 @@ class CartItemUpdate(BaseModel):
     quantity: int = Field(..., ge=1, description="Новое количество товара")
 
 
+class CartOperation(BaseModel):
+    op: str = Field(
+        pattern="^(add|set|remove)$",
+        description="add - добавить к количеству, set - задать количество, "
+        "remove - убрать товар из корзины",
+    )
+    product_id: int = Field(description="ID товара")
+    quantity: Optional[int] = Field(
+        None, ge=1, description="Количество товара (для add и set)"
+    )
+
+
+class CartBatchUpdate(BaseModel):
+    operations: List[CartOperation] = Field(
+        min_length=1, max_length=100, description="Операции в порядке применения"
+    )
+
+
 class CartItem(BaseModel):
     id: int = Field(..., description="ID позиции корзины")
     quantity: int = Field(..., ge=1, description="Количество товара")
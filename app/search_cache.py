@@ -0,0 +1,88 @@
+import time
+from bisect import bisect_right
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import TTLCache
+from app.config import SEARCH_CACHE_MAX_IDS, SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL
+from app.db_depends import replica_may_lag
+from app.models.products import Product
+from app.pagination import keyset_order
+
+_search_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+# Версия каталога входит в ключ кэша: запись товаров увеличивает её,
+# и старые списки больше не находятся, а потом вытесняются сами
+_catalog_version = 0
+_invalidated_at = 0.0
+
+
+def bump_catalog_version() -> None:
+    """
+    Делает недействительными все закэшированные результаты поиска.
+    Вызывается после записи товаров и категорий.
+    """
+    global _catalog_version, _invalidated_at
+    _catalog_version += 1
+    _invalidated_at = time.monotonic()
+
+
+def search_cache_key(search: str, params: dict[str, Any]) -> tuple:
+    normalized = tuple(
+        sorted((name, value) for name, value in params.items() if value is not None)
+    )
+    return _catalog_version, " ".join(search.lower().split()), normalized
+
+
+class RankedIds:
+    """
+    Найденные товары по убыванию (rank, id) - в том же порядке, что и
+    выдача поиска. complete=False, если совпадений больше, чем хранится.
+    """
+
+    __slots__ = ("ids", "ranks", "complete", "_keys")
+
+    def __init__(self, rows: list[tuple[int, float]], complete: bool):
+        self.ids = [id_ for id_, _ in rows]
+        self.ranks = [rank for _, rank in rows]
+        self.complete = complete
+        # По возрастанию, чтобы искать позицию курсора бинарным поиском
+        self._keys = [(-rank, -id_) for id_, rank in rows]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def position_after(self, rank: float, last_id: int) -> int:
+        """
+        Индекс первой строки строго после курсора (rank, last_id).
+        """
+        return bisect_right(self._keys, (-rank, -last_id))
+
+
+async def ranked_search_ids(
+    db: AsyncSession, filters: list, rank_col, key: tuple
+) -> RankedIds:
+    """
+    Ранжированный список id для поиска из кэша, при промахе - один запрос
+    с ts_rank. Хранятся первые SEARCH_CACHE_MAX_IDS совпадений: дальше
+    этого клиенты почти не листают, а более глубокие страницы читаются
+    из БД как раньше.
+    """
+    ranked = _search_cache.get(key)
+    if ranked is not None:
+        return ranked
+    rows = (
+        await db.execute(
+            select(Product.id, rank_col)
+            .where(*filters)
+            .order_by(*keyset_order(rank_col, Product.id, True))
+            .limit(SEARCH_CACHE_MAX_IDS + 1)
+        )
+    ).tuples().all()
+    complete = len(rows) <= SEARCH_CACHE_MAX_IDS
+    ranked = RankedIds(rows[:SEARCH_CACHE_MAX_IDS], complete)
+    # Список с отстающей реплики под новой версией каталога прожил бы весь TTL
+    if not replica_may_lag(db, _invalidated_at):
+        _search_cache.set(key, ranked)
+    return ranked
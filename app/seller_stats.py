@@ -0,0 +1,86 @@
+from sqlalchemy import Date, cast, delete, func, literal, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.orders import Order, order_products
+from app.models.products import Product
+from app.models.seller_stats import SellerDailyStats
+
+STAT_COLUMNS = ("orders_count", "units_sold", "revenue")
+
+
+def utc_day(column):
+    """
+    Календарный день момента времени по UTC: границы дней статистики
+    не зависят от часового пояса сервера БД.
+    """
+    return cast(func.timezone("UTC", column), Date)
+
+
+def _upsert(rows):
+    stmt = insert(SellerDailyStats).from_select(
+        ["seller_id", "product_id", "day", *STAT_COLUMNS], rows
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=["seller_id", "product_id", "day"],
+        set_={
+            name: getattr(SellerDailyStats, name) + getattr(stmt.excluded, name)
+            for name in STAT_COLUMNS
+        },
+    )
+
+
+async def apply_order_stats(db: AsyncSession, order_id: int, sign: int = 1) -> None:
+    """
+    Добавляет (sign=1) или вычитает (sign=-1) позиции заказа в дневной
+    статистике продавцов за день оплаты заказа одним INSERT ... ON CONFLICT.
+    Коммит остаётся за вызывающим, чтобы статистика менялась в той же
+    транзакции, что и статус заказа.
+    """
+    rows = (
+        select(
+            Product.seller_id,
+            order_products.c.product_id,
+            utc_day(Order.paid_at),
+            literal(sign),
+            sign * func.sum(order_products.c.quantity),
+            sign * func.sum(order_products.c.quantity * order_products.c.unit_price),
+        )
+        .join(Order, Order.id == order_products.c.order_id)
+        .join(Product, Product.id == order_products.c.product_id)
+        .where(order_products.c.order_id == order_id, Order.paid_at.is_not(None))
+        .group_by(Product.seller_id, order_products.c.product_id, Order.paid_at)
+        # Одинаковый порядок строк у параллельных заказов - без взаимоблокировок
+        .order_by(Product.seller_id, order_products.c.product_id)
+    )
+    await db.execute(_upsert(rows))
+
+
+async def recompute_seller_stats(db: AsyncSession) -> None:
+    """
+    Полностью пересобирает дневную статистику продавцов по оплаченным
+    заказам. Нужен для починки расхождений и первичного заполнения,
+    в обычной работе не используется.
+    """
+    day = utc_day(Order.paid_at)
+    rows = (
+        select(
+            Product.seller_id,
+            order_products.c.product_id,
+            day,
+            func.count(func.distinct(order_products.c.order_id)),
+            func.sum(order_products.c.quantity),
+            func.sum(order_products.c.quantity * order_products.c.unit_price),
+        )
+        .join(Order, Order.id == order_products.c.order_id)
+        .join(Product, Product.id == order_products.c.product_id)
+        .where(Order.status == "paid", Order.paid_at.is_not(None))
+        .group_by(Product.seller_id, order_products.c.product_id, day)
+    )
+    # Параллельные смены статуса ждут конца пересборки, иначе их вклад
+    # мог бы потеряться между DELETE и INSERT
+    await db.execute(
+        text(f"LOCK TABLE {SellerDailyStats.__tablename__} IN EXCLUSIVE MODE")
+    )
+    await db.execute(delete(SellerDailyStats))
+    await db.execute(_upsert(rows))
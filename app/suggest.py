@@ -0,0 +1,103 @@
+import time
+
+from sqlalchemy import func, literal, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import TTLCache
+from app.config import SUGGEST_CACHE_SIZE, SUGGEST_CACHE_TTL, SUGGEST_FUZZY_THRESHOLD
+from app.db_depends import replica_may_lag
+from app.models.products import Product
+
+SUGGEST_MIN_LENGTH = 2
+
+_suggest_cache = TTLCache(maxsize=SUGGEST_CACHE_SIZE, ttl=SUGGEST_CACHE_TTL)
+_invalidated_at = 0.0
+# Есть ли на сервере триграммный индекс; проверяется один раз на процесс
+_fuzzy_available: bool | None = None
+
+# То же выражение, что в индексе ix_products_name_prefix
+_name_key = func.lower(Product.name).collate("C")
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def invalidate_suggestions() -> None:
+    """
+    Сбрасывает кэш подсказок после записи товаров.
+    """
+    global _invalidated_at
+    _suggest_cache.clear()
+    _invalidated_at = time.monotonic()
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+async def _has_trigram_index(db: AsyncSession) -> bool:
+    global _fuzzy_available
+    if _fuzzy_available is None:
+        _fuzzy_available = bool(
+            await db.scalar(
+                text(
+                    "SELECT 1 FROM pg_indexes "
+                    "WHERE indexname = 'ix_products_name_trgm'"
+                )
+            )
+        )
+    return _fuzzy_available
+
+
+async def suggest_products(db: AsyncSession, query: str, limit: int) -> list[dict]:
+    """
+    Активные товары, название которых начинается с query, по алфавиту.
+    Если их меньше limit и есть триграммный индекс, список дополняется
+    похожими названиями (опечатки, фрагмент из середины названия).
+
+    Горячие префиксы отдаются из кэша процесса без обращения к БД.
+    """
+    query = normalize_query(query)
+    key = (query, limit)
+    cached = _suggest_cache.get(key)
+    if cached is not None:
+        return cached
+
+    columns = (Product.id, Product.name)
+    rows = (
+        await db.execute(
+            select(*columns)
+            .where(
+                Product.is_active == True,
+                _name_key.like(_escape_like(query) + "%", escape="\\"),
+            )
+            .order_by(_name_key)
+            .limit(limit)
+        )
+    ).all()
+    suggestions = [row._asdict() for row in rows]
+
+    if len(suggestions) < limit and await _has_trigram_index(db):
+        # word_similarity: насколько query похож на какое-то слово названия.
+        # Фильтр по %> идёт через GIN-индекс, порог - на уровне транзакции
+        await db.execute(
+            text("SELECT set_config('pg_trgm.word_similarity_threshold', :t, true)"),
+            {"t": str(SUGGEST_FUZZY_THRESHOLD)},
+        )
+        name = func.lower(Product.name)
+        fuzzy = await db.execute(
+            select(*columns)
+            .where(
+                Product.is_active == True,
+                name.op("%>")(literal(query)),
+                Product.id.not_in([row["id"] for row in suggestions]),
+            )
+            .order_by(func.word_similarity(literal(query), name).desc(), Product.id)
+            .limit(limit - len(suggestions))
+        )
+        suggestions.extend(row._asdict() for row in fuzzy)
+
+    if not replica_may_lag(db, _invalidated_at):
+        _suggest_cache.set(key, suggestions)
+    return suggestions
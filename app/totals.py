@@ -0,0 +1,96 @@
+import json
+import time
+from collections import defaultdict
+from typing import Any
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import TTLCache
+from app.config import (
+    TOTALS_CACHE_SIZE,
+    TOTALS_CACHE_TTL,
+    TOTALS_ESTIMATE_THRESHOLD,
+)
+from app.db_depends import replica_may_lag
+
+TOTAL_MODES_PATTERN = "^(exact|cached|estimate)$"
+
+_totals_cache = TTLCache(maxsize=TOTALS_CACHE_SIZE, ttl=TOTALS_CACHE_TTL)
+# Поколение данных по таблице: входит в ключ кэша, поэтому инвалидация
+# сводится к инкременту, а старые записи вытесняются сами
+_generations: defaultdict[str, int] = defaultdict(int)
+_invalidated_at: defaultdict[str, float] = defaultdict(float)
+
+
+def invalidate_totals(scope: str) -> None:
+    """
+    Сбрасывает закэшированные total для таблицы после записи в неё.
+    """
+    _generations[scope] += 1
+    _invalidated_at[scope] = time.monotonic()
+
+
+def _cache_key(scope: str, params: dict[str, Any]) -> tuple:
+    normalized = tuple(
+        sorted(
+            (name, value.strip().lower() if isinstance(value, str) else value)
+            for name, value in params.items()
+            if value is not None
+        )
+    )
+    return scope, _generations[scope], normalized
+
+
+async def _exact_total(db: AsyncSession, model, filters: list) -> int:
+    stmt = select(func.count()).select_from(model).where(*filters)
+    return await db.scalar(stmt) or 0
+
+
+async def _planner_estimate(db: AsyncSession, model, filters: list) -> int:
+    stmt = select(model.id).where(*filters)
+    compiled = stmt.compile(
+        dialect=db.get_bind().dialect, compile_kwargs={"render_postcompile": True}
+    )
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    conn = await db.connection()
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_total(
+    db: AsyncSession,
+    model,
+    filters: list,
+    params: dict[str, Any],
+    mode: str = "exact",
+) -> tuple[int, str]:
+    """
+    Возвращает total для отфильтрованного списка и режим, которым он получен.
+
+    exact - COUNT(*) на каждый запрос;
+    cached - COUNT(*) кэшируется по нормализованному набору фильтров
+    до записи в таблицу;
+    estimate - оценка планировщика, если она не меньше
+    TOTALS_ESTIMATE_THRESHOLD, иначе точный подсчёт (оценка доступна
+    только на Postgres).
+    """
+    scope = model.__tablename__
+    if mode == "cached":
+        key = _cache_key(scope, params)
+        total = _totals_cache.get(key)
+        if total is not None:
+            return total, "cached"
+        total = await _exact_total(db, model, filters)
+        # Отстающая реплика могла посчитать total без недавней записи
+        if not replica_may_lag(db, _invalidated_at[scope]):
+            _totals_cache.set(key, total)
+        return total, "exact"
+    if mode == "estimate" and db.get_bind().dialect.name == "postgresql":
+        estimate = await _planner_estimate(db, model, filters)
+        if estimate >= TOTALS_ESTIMATE_THRESHOLD:
+            return estimate, "estimate"
+    return await _exact_total(db, model, filters), "exact"
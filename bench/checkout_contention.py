@@ -0,0 +1,158 @@
+"""
+Конкурентное оформление заказов на один и тот же товар.
+
+Сотни покупателей одновременно оформляют корзину с одним SKU, остатка
+хватает не всем. Проверяется, что товар не продан сверх остатка, каждый
+запрос получил 201 или 409, а позиции заказов сходятся со списанием.
+База пересоздаётся, как и в bench.run:
+
+    BENCH_DATABASE_URL=... python -m bench.checkout_contention --buyers 300 --stock 100
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+
+from bench.run import _configure_env, percentile
+
+
+async def main_async(args) -> int:
+    from sqlalchemy import func, insert, select
+
+    from app.auth import create_access_token
+    from app.database import Base, async_engine
+    from app.main import app
+    from app.models.cart_items import CartItem
+    from app.models.categories import Category
+    from app.models.orders import order_products
+    from app.models.products import Product
+    from app.models.users import User
+    from app.request_logging import request_log
+
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        seller_id = await conn.scalar(
+            insert(User)
+            .values(email="seller@bench.local", hashed_password="!seller", role="seller")
+            .returning(User.id)
+        )
+        category_id = await conn.scalar(
+            insert(Category).values(name="Hot").returning(Category.id)
+        )
+        product_id = await conn.scalar(
+            insert(Product)
+            .values(
+                name="Hot item",
+                description="limited",
+                price=9.99,
+                stock=args.stock,
+                category_id=category_id,
+                seller_id=seller_id,
+            )
+            .returning(Product.id)
+        )
+        buyer_ids = (
+            await conn.scalars(
+                insert(User).returning(User.id),
+                [
+                    {
+                        "email": f"buyer{index}@bench.local",
+                        "hashed_password": f"!buyer{index}",
+                        "role": "buyer",
+                    }
+                    for index in range(args.buyers)
+                ],
+            )
+        ).all()
+        await conn.execute(
+            insert(CartItem),
+            [
+                {"user_id": buyer_id, "product_id": product_id, "quantity": 1}
+                for buyer_id in buyer_ids
+            ],
+        )
+
+    tokens = [
+        create_access_token({"sub": f"buyer{index}@bench.local", "id": buyer_id})
+        for index, buyer_id in enumerate(buyer_ids)
+    ]
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=120
+    ) as client:
+
+        async def checkout(token: str) -> None:
+            started = time.perf_counter()
+            response = await client.post(
+                "/orders/checkout", headers={"Authorization": f"Bearer {token}"}
+            )
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(checkout(token) for token in tokens))
+        elapsed = time.perf_counter() - started
+
+    async with async_engine.connect() as conn:
+        stock_left = await conn.scalar(
+            select(Product.stock).where(Product.id == product_id)
+        )
+        ordered = await conn.scalar(
+            select(func.coalesce(func.sum(order_products.c.quantity), 0)).where(
+                order_products.c.product_id == product_id
+            )
+        )
+    request_log.shutdown()
+    await async_engine.dispose()
+
+    expected_sold = min(args.stock, args.buyers)
+    problems = []
+    if stock_left < 0:
+        problems.append(f"oversold: stock is {stock_left}")
+    if statuses.get(201, 0) != expected_sold:
+        problems.append(f"expected {expected_sold} orders, got {statuses.get(201, 0)}")
+    if set(statuses) - {201, 409}:
+        problems.append(f"unexpected statuses: {statuses}")
+    if ordered != args.stock - stock_left:
+        problems.append(f"ordered {ordered} != decremented {args.stock - stock_left}")
+
+    latencies.sort()
+    report = {
+        "buyers": args.buyers,
+        "stock": args.stock,
+        "statuses": {str(code): count for code, count in statuses.items()},
+        "stock_left": stock_left,
+        "ordered_quantity": ordered,
+        "rps": round(args.buyers / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "problems": problems,
+    }
+    print(json.dumps(report, indent=2))
+    return 1 if problems else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent checkout of one SKU")
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument("--buyers", type=int, default=300)
+    parser.add_argument("--stock", type=int, default=100)
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("BENCH_DATABASE_URL or --database-url is required")
+
+    _configure_env(args.database_url)
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Накладные расходы журнала запросов на один запрос.
+
+Сравнивает приложение без журнала, прежний log_middleware (uuid4 и
+loguru с enqueue=True на каждый запрос) и RequestLoggingMiddleware при
+разной доле выборки. БД не нужна: эндпоинт ничего не делает.
+
+    python -m bench.logging_overhead --requests 5000 --rounds 5
+
+Варианты чередуются по раундам, в отчёт идёт лучший раунд каждого.
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from loguru import logger
+
+from app import request_logging
+from app.request_logging import RequestLoggingMiddleware
+
+
+def _plain_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+def _legacy_app(log_file: Path) -> FastAPI:
+    app = _plain_app()
+    logger.add(
+        log_file,
+        format="Log: [{extra[log_id]}:{time} - {level} - {message}]",
+        level="INFO",
+        enqueue=True,
+        filter=lambda record: "log_id" in record["extra"],
+    )
+
+    @app.middleware("http")
+    async def log_middleware(request: Request, call_next):
+        log_id = str(uuid.uuid4())
+        with logger.contextualize(log_id=log_id):
+            try:
+                response = await call_next(request)
+                logger.info(f"Request to {request.url.path} succeeded")
+            except Exception as e:
+                logger.error(f"Request to {request.url.path} failed: {e}")
+                response = JSONResponse(content={"success": False}, status_code=500)
+            return response
+
+    return app
+
+
+def _structured_app() -> FastAPI:
+    app = _plain_app()
+    app.add_middleware(RequestLoggingMiddleware)
+    return app
+
+
+async def _measure(app: FastAPI, requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(min(requests, 200)):
+            await client.get("/ping")
+        started = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/ping")
+        return (time.perf_counter() - started) / requests
+
+
+async def run(requests: int, rounds: int) -> dict:
+    log_dir = Path(tempfile.mkdtemp(prefix="bench-logging-"))
+    logger.remove()
+    logger.add(
+        log_dir / "requests.log",
+        format="{message}",
+        filter=lambda record: "request_log" in record["extra"],
+    )
+    request_logging.request_log.start()
+
+    # вариант -> (приложение, доля выборки журнала запросов)
+    variants = {
+        "baseline": (_plain_app(), None),
+        "legacy_log_middleware": (_legacy_app(log_dir / "legacy.log"), None),
+    }
+    for rate in (0.0, 0.1, 1.0):
+        variants[f"structured_sample_{rate}"] = (_structured_app(), rate)
+
+    results: dict[str, float] = {}
+    for _ in range(rounds):
+        for name, (app, rate) in variants.items():
+            if rate is not None:
+                request_logging.LOG_SAMPLE_RATE = rate
+            elapsed = await _measure(app, requests)
+            results[name] = min(results.get(name, elapsed), elapsed)
+    request_logging.request_log.shutdown()
+    await logger.complete()
+
+    baseline = results["baseline"]
+    return {
+        "requests": requests,
+        "rounds": rounds,
+        "per_request_us": {name: round(value * 1e6, 2) for name, value in results.items()},
+        "overhead_us": {
+            name: round((value - baseline) * 1e6, 2)
+            for name, value in results.items()
+            if name != "baseline"
+        },
+        "written": request_logging.request_log.written,
+        "dropped": request_logging.request_log.dropped,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests, args.rounds)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
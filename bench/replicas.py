@@ -0,0 +1,181 @@
+"""
+Чтение с реплик: отказ реплики и read-your-writes.
+
+Вторая база играет роль реплики без репликации: записи на primary на
+ней не появляются, поэтому по ответу видно, какая база его отдала. Перед
+ней в DATABASE_REPLICA_URLS стоит недоступная реплика. Проверяется, что
+фоновая проверка исключает недоступную реплику, ответ из кэша не берёт
+соединение, упавшая между проверками реплика исключается после первой
+ошибки, а после записи с primary читает только её автор. Обе базы
+пересоздаются:
+
+    BENCH_DATABASE_URL=... BENCH_REPLICA_DATABASE_URL=... python -m bench.replicas
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+import httpx
+
+from bench.run import _configure_env
+
+# Порт 1 на localhost закрыт: соединение отклоняется сразу
+DEAD_REPLICA_URL = "postgresql+asyncpg://bench@127.0.0.1:1/bench"
+
+
+async def main_async(args) -> int:
+    from sqlalchemy import insert
+
+    from app.auth import create_access_token, hash_password
+    from app.database import Base, async_engine, replicas
+    from app.main import app
+    from app.models.categories import Category
+    from app.models.products import Product
+    from app.models.users import User
+    from app.request_logging import request_log
+
+    dead, replica = 0, 1
+    databases = ((async_engine, "primary"), (replicas.engines[replica], "replica"))
+    for engine, name in databases:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(
+                insert(User),
+                [
+                    {
+                        "email": "seller@bench.local",
+                        "hashed_password": "!seller",
+                        "role": "seller",
+                    },
+                    {
+                        "email": "writer@bench.local",
+                        "hashed_password": hash_password("bench-password"),
+                        "role": "buyer",
+                    },
+                    {
+                        "email": "reader@bench.local",
+                        "hashed_password": "!reader",
+                        "role": "buyer",
+                    },
+                ],
+            )
+            await conn.execute(insert(Category).values(id=1, name="Root"))
+            await conn.execute(
+                insert(Product).values(
+                    id=1,
+                    name=f"Item on {name}",
+                    description="",
+                    price=9.99,
+                    stock=10,
+                    category_id=1,
+                    seller_id=1,
+                )
+            )
+
+    def auth(email: str, user_id: int) -> dict:
+        token = create_access_token({"sub": email, "id": user_id})
+        return {"Authorization": f"Bearer {token}"}
+
+    writer = auth("writer@bench.local", 2)
+    reader = auth("reader@bench.local", 3)
+    problems = []
+
+    def expect(condition: bool, message: str) -> None:
+        if not condition:
+            problems.append(message)
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await replicas.check()
+        health = [replica_stats["healthy"] for replica_stats in replicas.stats()]
+        expect(health == [False, True], f"health check: {health}")
+
+        names = set()
+        for _ in range(4):
+            response = await client.get("/products/1")
+            names.add(response.json().get("name", response.status_code))
+        expect(names == {"Item on replica"}, f"reads with dead replica down: {names}")
+
+        # Реплика упала после последней проверки: карточка из кэша отдаётся
+        # без соединения, первый запрос в БД исключает реплику из ротации
+        replicas.mark_up(dead)
+        statuses = [(await client.get("/products/1")).status_code for _ in range(2)]
+        expect(statuses == [200, 200], f"cached card with dead replica: {statuses}")
+        # Реплики чередуются, поэтому ровно один запрос попадает на упавшую
+        statuses = [
+            (await client.get("/products/1/reviews")).status_code for _ in range(4)
+        ]
+        expect(statuses.count(500) == 1, f"reads after replica failure: {statuses}")
+        expect(not replicas.stats()[dead]["healthy"], "failed replica is still in use")
+
+        # Вход и POST-чтение аутентифицированным пользователем не закрепляют его
+        response = await client.post(
+            "/users/token",
+            data={"username": "writer@bench.local", "password": "bench-password"},
+        )
+        expect(response.status_code == 200, f"login: {response.status_code}")
+        response = await client.post(
+            "/products/batch", json={"ids": [1]}, headers=writer
+        )
+        expect(response.status_code == 200, f"batch: {response.status_code}")
+        response = await client.get("/products/1/reviews/summary", headers=writer)
+        expect(
+            response.json().get("reviews_count") == 0,
+            "writer was pinned to primary without writing",
+        )
+
+        response = await client.post(
+            "/reviews/",
+            json={
+                "product_id": 1,
+                "comment": "ok",
+                "grade": 5,
+                "comment_date": "2026-01-01T00:00:00",
+            },
+            headers=writer,
+        )
+        expect(response.status_code == 201, f"create review: {response.status_code}")
+        counts = {}
+        clients = (("writer", writer), ("reader", reader), ("anonymous", {}))
+        for name, headers in clients:
+            response = await client.get("/products/1/reviews", headers=headers)
+            counts[name] = len(response.json()) if response.status_code == 200 else None
+        expect(
+            counts == {"writer": 1, "reader": 0, "anonymous": 0},
+            f"read-your-writes: expected only writer on primary, got {counts}",
+        )
+
+    request_log.shutdown()
+    await async_engine.dispose()
+    for engine in replicas.engines:
+        await engine.dispose()
+
+    print(json.dumps({"problems": problems}, indent=2))
+    return 1 if problems else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument(
+        "--replica-url", default=os.getenv("BENCH_REPLICA_DATABASE_URL")
+    )
+    args = parser.parse_args()
+    if not args.database_url or not args.replica_url:
+        parser.error(
+            "BENCH_DATABASE_URL and BENCH_REPLICA_DATABASE_URL "
+            "(or --database-url and --replica-url) are required"
+        )
+
+    _configure_env(args.database_url)
+    os.environ["DATABASE_REPLICA_URLS"] = f"{DEAD_REPLICA_URL},{args.replica_url}"
+    os.environ["DB_CONNECT_TIMEOUT"] = "1"
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Нагрузочные сценарии. Каждый сценарий делает один HTTP-запрос к
+приложению; runner вызывает его много раз параллельно.
+"""
+
+import random
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+import httpx
+
+from bench.seed import BENCH_PASSWORD, BenchData
+
+Request = Callable[[httpx.AsyncClient, BenchData, random.Random], Awaitable[httpx.Response]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    request: Request
+    # Ограничение числа запросов для дорогих сценариев (bcrypt)
+    max_requests: int | None = None
+    # Фоновая нагрузка на время сценария: её запросы не измеряются
+    background: Request | None = None
+    background_concurrency: int = 0
+
+
+SCENARIOS: dict[str, Scenario] = {}
+
+
+def scenario(
+    name: str,
+    description: str,
+    max_requests: int | None = None,
+    background: Request | None = None,
+    background_concurrency: int = 0,
+):
+    def register(request: Request) -> Request:
+        SCENARIOS[name] = Scenario(
+            name, description, request, max_requests, background, background_concurrency
+        )
+        return request
+
+    return register
+
+
+def _auth(buyer: dict) -> dict:
+    return {"Authorization": f"Bearer {buyer['token']}"}
+
+
+@scenario("catalog_browse", "Анонимный список товаров с фильтрами и сортировкой")
+async def catalog_browse(client, data, rng):
+    params = {
+        "category_id": rng.choice(data.category_ids),
+        "sort": rng.choice(["id", "price", "rating", "newest"]),
+        "page": rng.randint(1, 3),
+    }
+    if rng.random() < 0.5:
+        low = rng.randint(1, 1000)
+        params.update(min_price=low, max_price=low + rng.randint(50, 1000))
+    if rng.random() < 0.3:
+        params["in_stock"] = "true"
+    return await client.get("/products/", params=params)
+
+
+@scenario("catalog_facets", "Поиск со счётчиками фасетов для фильтров витрины")
+async def catalog_facets(client, data, rng):
+    return await client.get(
+        "/products/",
+        params={
+            "search": rng.choice(data.search_terms),
+            "category_id": rng.choice(data.category_ids),
+            "facets": "category,price,stock,seller",
+        },
+        headers=_auth(rng.choice(data.buyers)),
+    )
+
+
+@scenario("search", "Полнотекстовый поиск авторизованного покупателя (мимо кэша)")
+async def search(client, data, rng):
+    terms = rng.sample(data.search_terms, rng.randint(1, 2))
+    return await client.get(
+        "/products/",
+        params={"search": " ".join(terms)},
+        headers=_auth(rng.choice(data.buyers)),
+    )
+
+
+@scenario("suggest", "Автодополнение названия товара по префиксу")
+async def suggest(client, data, rng):
+    word = rng.choice(data.search_terms)
+    return await client.get(
+        "/products/suggest", params={"q": word[: rng.randint(2, len(word))]}
+    )
+
+
+@scenario("product_detail", "Карточка товара")
+async def product_detail(client, data, rng):
+    return await client.get(f"/products/{rng.choice(data.product_ids)}")
+
+
+@scenario("login", "Вход по паролю (bcrypt в пуле воркеров)", max_requests=50)
+async def login(client, data, rng):
+    buyer = rng.choice(data.buyers)
+    return await client.post(
+        "/users/token",
+        data={"username": buyer["email"], "password": BENCH_PASSWORD},
+    )
+
+
+@scenario(
+    "catalog_during_login_storm",
+    "Список товаров, пока параллельные входы загружают пул bcrypt",
+    background=login,
+    background_concurrency=20,
+)
+async def catalog_during_login_storm(client, data, rng):
+    return await catalog_browse(client, data, rng)
+
+
+@scenario("cart_view", "Просмотр корзины (кэш аутентификации)")
+async def cart_view(client, data, rng):
+    return await client.get("/cart/cart", headers=_auth(rng.choice(data.buyers)))
+
+
+@scenario("cart_add", "Добавление товара в корзину")
+async def cart_add(client, data, rng):
+    return await client.post(
+        "/cart/items",
+        json={"product_id": rng.choice(data.product_ids), "quantity": 1},
+        headers=_auth(rng.choice(data.buyers)),
+    )
+
+
+@scenario("cart_update", "Изменение количества товара в корзине")
+async def cart_update(client, data, rng):
+    buyer = rng.choice(data.buyers)
+    product_id = rng.choice(buyer["cart_product_ids"])
+    return await client.put(
+        f"/cart/items/{product_id}",
+        json={"quantity": rng.randint(1, 5)},
+        headers=_auth(buyer),
+    )
+
+
+@scenario("cart_batch", "Пакетное изменение корзины (PATCH /cart/items)")
+async def cart_batch(client, data, rng):
+    buyer = rng.choice(data.buyers)
+    return await client.patch(
+        "/cart/items",
+        json={
+            "operations": [
+                {"op": "set", "product_id": product_id, "quantity": rng.randint(1, 5)}
+                for product_id in buyer["cart_product_ids"]
+            ]
+            + [
+                {"op": "add", "product_id": rng.choice(data.product_ids), "quantity": 1}
+            ]
+        },
+        headers=_auth(buyer),
+    )
+
+
+@scenario("review_create", "Создание отзыва (счётчики рейтинга и инвалидация кэша)")
+async def review_create(client, data, rng):
+    return await client.post(
+        "/reviews/",
+        json={
+            "product_id": rng.choice(data.product_ids),
+            "comment": "bench",
+            "grade": rng.randint(1, 5),
+            "comment_date": datetime.now(timezone.utc).isoformat(),
+        },
+        headers=_auth(rng.choice(data.buyers)),
+    )
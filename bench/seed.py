@@ -0,0 +1,119 @@
+"""
+Тестовые данные для нагрузочных сценариев. Схема пересоздаётся с нуля.
+"""
+
+import random
+from dataclasses import dataclass, field
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.auth import create_access_token, hash_password
+from app.database import Base
+from app.models.cart_items import CartItem
+from app.models.categories import Category
+from app.models.products import Product
+from app.models.users import User
+
+BENCH_PASSWORD = "bench-password"
+
+WORDS = (
+    "phone", "laptop", "camera", "headphones", "keyboard", "monitor", "tablet",
+    "speaker", "charger", "watch", "router", "printer", "mouse", "drone",
+    "wireless", "portable", "gaming", "compact", "premium", "classic",
+)
+
+
+@dataclass
+class BenchData:
+    category_ids: list[int]
+    product_ids: list[int]
+    buyers: list[dict]
+    search_terms: list[str] = field(default_factory=lambda: list(WORDS))
+
+
+async def seed(
+    engine: AsyncEngine, products: int, buyers: int, seed_value: int = 42
+) -> BenchData:
+    rng = random.Random(seed_value)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+        # bcrypt с солью: у каждого пользователя свой хеш (столбец уникален)
+        users = [
+            {
+                "email": f"buyer{index}@bench.local",
+                "hashed_password": hash_password(BENCH_PASSWORD),
+                "role": "buyer",
+            }
+            for index in range(buyers)
+        ] + [
+            {
+                "email": f"seller{index}@bench.local",
+                "hashed_password": f"!seller{index}",
+                "role": "seller",
+            }
+            for index in range(5)
+        ]
+        await conn.execute(insert(User), users)
+        user_rows = (await conn.execute(select(User.id, User.email, User.role))).all()
+        seller_ids = [row.id for row in user_rows if row.role == "seller"]
+
+        # Пять корневых категорий по три подкатегории
+        category_ids = []
+        for root in range(5):
+            root_id = await conn.scalar(
+                insert(Category).values(name=f"Root {root}").returning(Category.id)
+            )
+            category_ids.append(root_id)
+            for child in range(3):
+                category_ids.append(
+                    await conn.scalar(
+                        insert(Category)
+                        .values(name=f"Category {root}.{child}", parent_id=root_id)
+                        .returning(Category.id)
+                    )
+                )
+
+        rows = []
+        for index in range(products):
+            words = rng.sample(WORDS, 3)
+            rows.append(
+                {
+                    "name": f"{words[0].title()} {words[1]} {index}",
+                    "description": " ".join(rng.sample(WORDS, 8)),
+                    "price": round(rng.uniform(1, 2000), 2),
+                    "stock": rng.randint(0, 500),
+                    "category_id": rng.choice(category_ids),
+                    "seller_id": rng.choice(seller_ids),
+                }
+            )
+        for start in range(0, len(rows), 1000):
+            await conn.execute(insert(Product), rows[start : start + 1000])
+        product_ids = list((await conn.scalars(select(Product.id))).all())
+
+        buyer_rows = [row for row in user_rows if row.role == "buyer"]
+        cart_rows = []
+        buyer_data = []
+        for row in buyer_rows:
+            cart_products = rng.sample(product_ids, 3)
+            cart_rows.extend(
+                {"user_id": row.id, "product_id": product_id, "quantity": 1}
+                for product_id in cart_products
+            )
+            buyer_data.append(
+                {
+                    "id": row.id,
+                    "email": row.email,
+                    "cart_product_ids": cart_products,
+                    "token": create_access_token(
+                        {"sub": row.email, "role": "buyer", "id": row.id}
+                    ),
+                }
+            )
+        await conn.execute(insert(CartItem), cart_rows)
+
+    return BenchData(
+        category_ids=category_ids, product_ids=product_ids, buyers=buyer_data
+    )
@@ -0,0 +1,109 @@
+"""
+Сериализация страницы списка: ORM + pydantic против Core + orjson.
+
+Прежний путь - ORM-объекты (identity map), валидация схемы ответа с
+from_attributes и JSON через pydantic. Быстрый путь - Core-строки,
+словари с полями схемы и orjson. Сравниваются страницы из 20, 100 и
+1000 товаров; база пересоздаётся, как и в bench.run:
+
+    BENCH_DATABASE_URL=... python -m bench.serialization --rounds 5
+
+Варианты чередуются по раундам, в отчёт идёт лучший раунд каждого.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import List
+
+from bench.run import _configure_env
+
+PAGE_SIZES = (20, 100, 1000)
+
+
+async def main_async(args) -> int:
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+
+    from app.database import async_engine, async_session_maker
+    from app.fast_json import dump_json, rows_to_dicts
+    from app.models.products import Product
+    from app.request_logging import request_log
+    from app.schemas import ProductCreate
+    from bench.seed import seed
+
+    await seed(async_engine, products=max(PAGE_SIZES), buyers=1)
+    adapter = TypeAdapter(List[ProductCreate])
+    fields = tuple(ProductCreate.model_fields)
+
+    async def orm_pydantic(size: int) -> bytes:
+        async with async_session_maker() as db:
+            stmt = select(Product).order_by(Product.id).limit(size)
+            products = (await db.scalars(stmt)).all()
+            return adapter.dump_json(adapter.validate_python(products, from_attributes=True))
+
+    async def core_orjson(size: int) -> bytes:
+        async with async_session_maker() as db:
+            stmt = select(Product.id, *(getattr(Product, name) for name in fields))
+            rows = (await db.execute(stmt.order_by(Product.id).limit(size))).all()
+            return dump_json(rows_to_dicts(rows, fields))
+
+    variants = {"orm_pydantic": orm_pydantic, "core_orjson": core_orjson}
+    problems = []
+    for size in PAGE_SIZES:
+        bodies = {name: await variant(size) for name, variant in variants.items()}
+        if len(set(bodies.values())) != 1:
+            problems.append(f"page {size}: bodies differ between variants")
+
+    results: dict[str, dict[str, float]] = {name: {} for name in variants}
+    for _ in range(args.rounds):
+        for size in PAGE_SIZES:
+            # Меньше повторов на больших страницах: время раунда сопоставимо
+            repeats = max(args.requests * PAGE_SIZES[0] // size, 5)
+            for name, variant in variants.items():
+                started = time.perf_counter()
+                for _ in range(repeats):
+                    await variant(size)
+                elapsed = (time.perf_counter() - started) / repeats
+                best = results[name].get(str(size), elapsed)
+                results[name][str(size)] = min(best, elapsed)
+
+    request_log.shutdown()
+    await async_engine.dispose()
+
+    report = {
+        "rounds": args.rounds,
+        "per_page_ms": {
+            name: {size: round(value * 1000, 3) for size, value in timings.items()}
+            for name, timings in results.items()
+        },
+        "speedup": {
+            str(size): round(
+                results["orm_pydantic"][str(size)] / results["core_orjson"][str(size)], 2
+            )
+            for size in PAGE_SIZES
+        },
+        "problems": problems,
+    }
+    print(json.dumps(report, indent=2))
+    return 1 if problems else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("BENCH_DATABASE_URL or --database-url is required")
+
+    _configure_env(args.database_url)
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()